@@ -117,18 +117,7 @@ products_df.FILL_IN
 
 # COMMAND ----------
 
-verify_files = dbutils.fs.ls(products_output_path)
-verify_delta_format = False
-verify_num_data_files = 0
-for f in verify_files:
-    if f.name == "_delta_log/":
-        verify_delta_format = True
-    elif f.name.endswith(".parquet"):
-        verify_num_data_files += 1
-
-assert verify_delta_format, "Data not written in Delta format"
-assert verify_num_data_files > 0, "No data written"
-del verify_files, verify_delta_format, verify_num_data_files
+DA.verify_delta_output(products_output_path)
 print("All test pass")
 
 # COMMAND ----------
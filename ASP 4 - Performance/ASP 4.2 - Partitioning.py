@@ -100,6 +100,18 @@ coalesce_df.rdd.getNumPartitions()
 
 # COMMAND ----------
 
+# MAGIC %md The partition count alone does not tell us how evenly the data is spread. **`DA.display_partition_stats`** computes the rows and approximate bytes of every partition in one job and reports the skew ratio (largest partition over the median) along with any stragglers.
+
+# COMMAND ----------
+
+repartition_stats = DA.display_partition_stats(repartitioned_df)
+
+# COMMAND ----------
+
+coalesce_stats = DA.display_partition_stats(coalesce_df)
+
+# COMMAND ----------
+
 # MAGIC %md ### Configure default shuffle partitions
 # MAGIC 
 # MAGIC Use the SparkSession's **`conf`** attribute to get and set dynamic Spark configuration properties. The **`spark.sql.shuffle.partitions`** property determines the number of partitions that result from a shuffle. Let's check its default value:
@@ -76,22 +76,8 @@ dbutils.fs.rm(delta_dest_dir, True)
 
 # COMMAND ----------
 
-verify_files = dbutils.fs.ls(delta_dest_dir)
-verify_delta_format = False
-verify_num_data_files = 0
-for f in verify_files:
-    if f.name == "_delta_log/":
-        verify_delta_format = True
-    elif f.name.endswith(".parquet"):
-        verify_num_data_files += 1
-
-assert verify_delta_format, "Data not written in Delta format"
-assert verify_num_data_files == 1, "Expected 1 data file written"
-
-verify_record_count = spark.read.format("delta").load(delta_dest_dir).count()
-assert verify_record_count == 100000, "Expected 100000 records in final result"
-
-del verify_files, verify_delta_format, verify_num_data_files, verify_record_count
+# Files and records are counted from the Delta transaction log, so no data needs to be scanned
+DA.verify_delta_output(delta_dest_dir, expected_files=1, expected_records=100000)
 print("All test pass")
 
 # COMMAND ----------
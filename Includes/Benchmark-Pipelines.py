@@ -0,0 +1,290 @@
+# Databricks notebook source
+# Headless benchmark of the pipelines from the Solutions notebooks. Each pipeline runs against data produced by the
+# synthetic generator (./_data_generator) at one or more scale factors, on a local SparkSession, with stand-ins for
+# dbutils and display. For every run we record wall time, stage count, shuffle bytes and the summed peak execution memory
+# of its tasks, taken from the Spark UI's REST API, plus the executors' peak JVM heap per scale factor, and write a JSON
+# report that can be compared across commits and Spark configurations.
+#
+#   python "Includes/Benchmark-Pipelines.py" --scale-factors 1 10 --output benchmark.json --conf spark.sql.shuffle.partitions=8
+#
+# As a notebook, the two %run cells below load the course helpers and the generator; run as a script they are comments.
+
+# COMMAND ----------
+
+# MAGIC %run ./Classroom-Setup
+
+# COMMAND ----------
+
+# MAGIC %run ./_data_generator
+
+# COMMAND ----------
+
+import json, os, sys, time, shutil, tempfile, urllib.request
+
+# COMMAND ----------
+
+class HeadlessHelper:
+    # Stands in for DBAcademyHelper so that the generator notebook can be loaded without the dbacademy library
+
+    def __init__(self, working_dir):
+        self.paths = type("Paths", (), {})()
+        self.paths.working_dir = working_dir
+        self.paths.datasets = working_dir
+
+    @staticmethod
+    def monkey_patch(function_ref):
+        setattr(HeadlessHelper, function_ref.__name__, function_ref)
+
+class HeadlessFS:
+    # The subset of dbutils.fs used by the pipelines, backed by the local filesystem
+
+    FileInfo = type("FileInfo", (), {"isDir": lambda self: self.path.endswith("/")})
+
+    def ls(self, path):
+        results = []
+        for name in sorted(os.listdir(path)):
+            info = HeadlessFS.FileInfo()
+            is_dir = os.path.isdir(os.path.join(path, name))
+            info.name = name + ("/" if is_dir else "")
+            info.path = os.path.join(path, info.name)
+            info.size = 0 if is_dir else os.path.getsize(os.path.join(path, name))
+            results.append(info)
+        return results
+
+    def rm(self, path, recurse=False):
+        if os.path.isdir(path): shutil.rmtree(path) if recurse else os.rmdir(path)
+        elif os.path.exists(path): os.remove(path)
+        return True
+
+    def mkdirs(self, path):
+        os.makedirs(path, exist_ok=True)
+        return True
+
+def create_local_spark(confs):
+    from pyspark.sql import SparkSession
+
+    builder = (SparkSession.builder
+               .master(os.environ.get("SPARK_MASTER", "local[*]"))
+               .appName("asp-pipeline-benchmarks")
+               .config("spark.ui.enabled", "true")
+               .config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension")
+               .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog"))
+    for key, value in confs.items():
+        builder = builder.config(key, value)
+
+    try:
+        from delta import configure_spark_with_delta_pip
+        builder = configure_spark_with_delta_pip(builder)
+    except ImportError:
+        pass  # Expect the Delta jars to be provided via spark.jars.packages or the classpath
+    
+    return builder.getOrCreate()
+
+# COMMAND ----------
+
+def pipeline_revenue_by_traffic(spark, paths, work_dir):
+    from pyspark.sql.functions import avg, col, round, sum
+    df = (spark.read.format("delta").load(paths["events"])
+          .withColumn("revenue", col("ecommerce.purchase_revenue_in_usd"))
+          .filter(col("revenue").isNotNull())
+          .drop("event_name"))
+    return (df.groupBy("traffic_source")
+              .agg(sum(col("revenue")).alias("total_rev"), avg(col("revenue")).alias("avg_rev"))
+              .sort(col("total_rev").desc())
+              .limit(3)
+              .withColumn("avg_rev", round("avg_rev", 2))
+              .withColumn("total_rev", round("total_rev", 2)))
+
+def pipeline_active_users(spark, paths, work_dir):
+    from pyspark.sql.functions import approx_count_distinct, avg, col, date_format, to_date
+    df = spark.read.format("delta").load(paths["events"]).select("user_id", col("event_timestamp").alias("ts"))
+    return (df.withColumn("ts", (col("ts") / 1e6).cast("timestamp"))
+              .withColumn("date", to_date("ts"))
+              .groupBy("date").agg(approx_count_distinct("user_id").alias("active_users"))
+              .withColumn("day", date_format(col("date"), "E"))
+              .groupBy("day").agg(avg(col("active_users")).alias("avg_users")))
+
+def pipeline_abandoned_carts(spark, paths, work_dir):
+    from pyspark.sql.functions import col, collect_set, explode, lit
+    sales_df = spark.read.format("delta").load(paths["sales"])
+    users_df = spark.read.format("delta").load(paths["users"])
+    events_df = spark.read.format("delta").load(paths["events"])
+
+    converted_users_df = sales_df.select("email").distinct().withColumn("converted", lit(True))
+    conversions_df = users_df.join(converted_users_df, "email", "outer").filter(col("email").isNotNull()).na.fill(False)
+    carts_df = events_df.withColumn("items", explode("items")).groupBy("user_id").agg(collect_set("items.item_id").alias("cart"))
+    return (conversions_df.join(carts_df, "user_id", "left")
+              .filter(col("converted") == False)
+              .filter(col("cart").isNotNull())
+              .withColumn("items", explode("cart"))
+              .groupBy("items").count()
+              .sort("items"))
+
+def pipeline_dedup_people(spark, paths, work_dir):
+    from pyspark.sql.functions import col, lower, translate
+    deduped_df = (spark.read.format("delta").load(paths["people"])
+                  .select(col("*"),
+                          lower(col("firstName")).alias("lcFirstName"),
+                          lower(col("lastName")).alias("lcLastName"),
+                          lower(col("middleName")).alias("lcMiddleName"),
+                          translate(col("ssn"), "-", "").alias("ssnNums"))
+                  .dropDuplicates(["lcFirstName", "lcMiddleName", "lcLastName", "ssnNums", "gender", "birthDate", "salary"])
+                  .drop("lcFirstName", "lcMiddleName", "lcLastName", "ssnNums"))
+    deduped_df.repartition(1).write.mode("overwrite").format("delta").save(f"{work_dir}/people")
+    return None
+
+def pipeline_coupon_sales_stream(spark, paths, work_dir):
+    from pyspark.sql.functions import col, explode
+    coupon_sales_df = (spark.readStream.option("maxFilesPerTrigger", 1).format("delta").load(paths["sales"])
+                       .withColumn("items", explode(col("items")))
+                       .filter(col("items.coupon").isNotNull()))
+    query = (coupon_sales_df.writeStream
+             .outputMode("append")
+             .format("delta")
+             .queryName("coupon_sales")
+             .trigger(availableNow=True)
+             .option("checkpointLocation", f"{work_dir}/coupon-sales/checkpoint")
+             .start(f"{work_dir}/coupon-sales/output"))
+    query.awaitTermination()
+    return query
+
+def pipeline_delta_rewrite(spark, paths, work_dir):
+    from pyspark.sql.functions import col
+    delta_path = f"{work_dir}/delta-events"
+    events_df = spark.read.format("delta").load(paths["events"])
+    events_df.write.format("delta").mode("overwrite").save(delta_path)
+
+    state_events_df = events_df.withColumn("state", col("geo.state"))
+    state_events_df.write.format("delta").mode("overwrite").partitionBy("state").option("overwriteSchema", "true").save(delta_path)
+    state_events_df.filter(col("device").isin(["Android", "iOS"])).write.format("delta").mode("overwrite").save(delta_path)
+    return None
+
+benchmark_pipelines = {
+    "revenue_by_traffic": pipeline_revenue_by_traffic,
+    "active_users": pipeline_active_users,
+    "abandoned_carts": pipeline_abandoned_carts,
+    "dedup_people": pipeline_dedup_people,
+    "coupon_sales_stream": pipeline_coupon_sales_stream,
+    "delta_rewrite": pipeline_delta_rewrite,
+}
+
+# COMMAND ----------
+
+def fetch_ui_json(spark, path):
+    app_id = spark.sparkContext.applicationId
+    with urllib.request.urlopen(f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{app_id}/{path}") as response:
+        return json.loads(response.read())
+
+def collect_job_group_metrics(spark, job_group):
+    # The UI's status store is fed asynchronously by the listener bus; wait until it has caught up with the tracker
+    job_ids = spark.sparkContext.statusTracker().getJobIdsForGroup(job_group)
+    for _ in range(50):
+        jobs = [j for j in fetch_ui_json(spark, "jobs") if j["jobId"] in job_ids]
+        if len(jobs) == len(job_ids) and all(j["status"] != "RUNNING" for j in jobs): break
+        time.sleep(0.1)
+
+    stage_ids = sorted({s for j in jobs for s in j["stageIds"]})
+    stages = [attempt for s in stage_ids for attempt in fetch_ui_json(spark, f"stages/{s}") if attempt["status"] == "COMPLETE"]
+
+    return {"jobs": len(job_ids),
+            "stages": len(stages),
+            "tasks": sum(s["numCompleteTasks"] for s in stages),
+            "input_bytes": sum(s["inputBytes"] for s in stages),
+            "shuffle_read_bytes": sum(s["shuffleReadBytes"] for s in stages),
+            "shuffle_write_bytes": sum(s["shuffleWriteBytes"] for s in stages),
+            # A stage's peakExecutionMemory is the sum of its tasks' peaks, not what was in use at any one time
+            "max_stage_task_peak_memory_sum_bytes": max([s.get("peakExecutionMemory", 0) for s in stages], default=0)}
+
+def collect_peak_jvm_heap(spark):
+    # The executors' peak is over the life of the application, so run_benchmarks starts one per scale factor when it can
+    return max([e.get("peakMemoryMetrics", {}).get("JVMHeapMemory", 0) for e in fetch_ui_json(spark, "executors")], default=0)
+
+def run_pipeline(spark, name, paths, work_dir):
+    pipeline = benchmark_pipelines[name]
+    job_group = f"benchmark-{name}-{time.time_ns()}"
+    spark.sparkContext.setJobGroup(job_group, f"Benchmark: {name}")
+
+    start = time.perf_counter()
+    result = pipeline(spark, paths, work_dir)
+    if hasattr(result, "runId"):
+        # A streaming query runs its jobs under its own run id, replacing the job group set above
+        job_group = str(result.runId)
+    elif result is not None:
+        result.write.format("noop").mode("overwrite").save()  # Executes the whole plan without collecting to the driver
+    wall_seconds = time.perf_counter() - start
+
+    return {"pipeline": name, "wall_seconds": round(wall_seconds, 3), **collect_job_group_metrics(spark, job_group)}
+
+# COMMAND ----------
+
+def run_benchmarks(spark, scale_factors=(1,), pipelines=None, skew=0.0, seed=42, work_dir=None, new_session=None):
+    helper_globals = globals()
+    if "DBAcademyHelper" not in helper_globals:
+        # Headless: load the generator notebook against the stand-in helper
+        helper_globals["DBAcademyHelper"] = HeadlessHelper
+        # Only reached when run as a script; as a notebook, the %run cells above have already loaded the generator
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "_data_generator.py")) as f:
+            exec(f.read(), helper_globals)
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="asp-benchmarks-")
+    helper = helper_globals["DA"] if "DA" in helper_globals else HeadlessHelper(work_dir)
+    pipelines = pipelines or list(benchmark_pipelines.keys())
+    results = []
+    peak_jvm_heap = {}
+
+    for i, scale_factor in enumerate(scale_factors):
+        if new_session is not None and i > 0:
+            # A fresh application per scale factor, so that its executors' peak heap covers this scale factor alone. The
+            # generator reads the global session, which is replaced as well.
+            spark.stop()
+            spark = helper_globals["spark"] = new_session()
+
+        data_dir = f"{work_dir}/data/x{scale_factor}"
+        generated = helper.generate_datasets(scale_factor=scale_factor, skew=skew, seed=seed, path=data_dir)
+        paths = {name: g["path"] for name, g in generated.items()}
+
+        for name in pipelines:
+            output_dir = f"{work_dir}/output/x{scale_factor}/{name}"
+            dbutils.fs.rm(output_dir, True)
+            
+            print(f"Running {name} at {scale_factor}x", end="...")
+            result = run_pipeline(spark, name, paths, output_dir)
+            print(f"({result['wall_seconds']} seconds)")
+            results.append({"scale_factor": scale_factor, "skew": skew, **result})
+
+        # Without new_session (as a notebook) this is the peak since the cluster started, up to and including this scale factor
+        peak_jvm_heap[str(scale_factor)] = collect_peak_jvm_heap(spark)
+
+    return {"spark_version": spark.version,
+            "default_parallelism": spark.sparkContext.defaultParallelism,
+            "spark_conf": {k: v for k, v in spark.sparkContext.getConf().getAll() if k.startswith("spark.sql.")},
+            "peak_jvm_heap_bytes": peak_jvm_heap,
+            "results": results}
+
+# COMMAND ----------
+
+if "spark" not in globals():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the Solutions notebook pipelines on a local SparkSession")
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=[1])
+    parser.add_argument("--pipelines", nargs="+", choices=list(benchmark_pipelines.keys()), default=None)
+    parser.add_argument("--skew", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=None)
+    parser.add_argument("--output", default=None, help="Where to write the JSON report (defaults to stdout)")
+    parser.add_argument("--conf", action="append", default=[], help="Spark configuration as key=value, may be repeated")
+    args = parser.parse_args()
+
+    confs = dict(c.split("=", 1) for c in args.conf)
+    spark = create_local_spark(confs)
+    dbutils = type("DBUtils", (), {"fs": HeadlessFS()})()
+    display = lambda df: df.show(20, truncate=False)
+
+    scale_factors = [int(s) if float(s).is_integer() else s for s in args.scale_factors]
+    report = run_benchmarks(spark, scale_factors, args.pipelines, args.skew, args.seed, args.work_dir, new_session=lambda: create_local_spark(confs))
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f: json.dump(report, f, indent=2)
@@ -24,7 +24,7 @@ def validate_1_1(self, df):
 @ValidationHelper.monkey_patch
 def validate_2_1(self, schema: StructType):
 
-    suite = DA.tests.new("5.1a-2.1")
+    suite = DA.tests.new_batched("5.1a-2.1")
 
     suite.test_equals(
         actual_value=lambda: type(schema),
@@ -40,13 +40,15 @@ def validate_2_1(self, schema: StructType):
         hint="Found [[LEN_ACTUAL_VALUE]]: [[ACTUAL_VALUE]]",
     )
 
-    suite.test_schema_field(lambda: schema, "order_id", "LongType", None)
-    suite.test_schema_field(lambda: schema, "email", "StringType", None)
-    suite.test_schema_field(lambda: schema, "transaction_timestamp", "LongType", None)
-    suite.test_schema_field(lambda: schema, "total_item_quantity", "LongType", None)
-    suite.test_schema_field(lambda: schema, "purchase_revenue_in_usd", "DoubleType", None)
-    suite.test_schema_field(lambda: schema, "unique_items", "LongType", None)
-    suite.test_schema_field(lambda: schema, "items", "StructType", None)
+    suite.test_schema(lambda: schema, {
+        "order_id": "LongType",
+        "email": "StringType",
+        "transaction_timestamp": "LongType",
+        "total_item_quantity": "LongType",
+        "purchase_revenue_in_usd": "DoubleType",
+        "unique_items": "LongType",
+        "items": "StructType",
+    })
 
     suite.display_results()
     assert suite.passed, "One or more tests failed."
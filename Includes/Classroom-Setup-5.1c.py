@@ -23,7 +23,7 @@ def validate_1_1(self, df):
 
 @ValidationHelper.monkey_patch
 def validate_2_1(self, schema:StructType):
-    suite = DA.tests.new("5.1c-2.1")
+    suite = DA.tests.new_batched("5.1c-2.1")
     suite.test_equals(lambda: type(schema), 
                       expected_value=StructType, 
                       description="Schema is of type StructType",
@@ -31,8 +31,7 @@ def validate_2_1(self, schema:StructType):
     
     suite.test_length(lambda: schema.fieldNames(), 2, description="Schema contians two fields", hint="Found [[LEN_ACTUAL_VALUE]]: [[ACTUAL_VALUE]]")
 
-    suite.test_schema_field(lambda: schema, "traffic_source", "StringType", None)
-    suite.test_schema_field(lambda: schema, "active_users", "LongType", None)
+    suite.test_schema(lambda: schema, {"traffic_source": "StringType", "active_users": "LongType"})
     
     suite.display_results()
     assert suite.passed, "One or more tests failed."
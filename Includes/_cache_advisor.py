@@ -0,0 +1,77 @@
+# Databricks notebook source
+# Flags the pattern from the end of ASP 4.1: a selective filter evaluated over a cached relation whose source could have
+# evaluated that filter itself. For each such filter the advisor measures the selectivity on a sample of the cached data and
+# compares the bytes scanned from the cache with the bytes the source would return if the filter were pushed down.
+# Opt-in: not loaded by _common; use %run ../Includes/_cache_advisor after the classroom setup.
+
+# COMMAND ----------
+
+# MAGIC %run ./_query_plans
+
+# COMMAND ----------
+
+pushdown_sources = ["JDBCRelation", "parquet", "orc", "delta", "Parquet", "Delta"]
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def advise_cache_pushdown(self, df, sample_fraction=0.01, selectivity_threshold=0.2, verbose=True):
+    from pyspark.sql import DataFrame
+    from pyspark.sql.functions import expr
+
+    def seq(scala_seq):
+        return [scala_seq.apply(i) for i in range(scala_seq.size())]
+
+    def walk(node):
+        yield node
+        for child in seq(node.children()):
+            yield from walk(child)
+
+    def cached_relation_below(node):
+        # Looks through projections, the only operators allowed between the filter and the cache
+        while node.nodeName() == "Project":
+            node = node.child()
+        return node if node.nodeName() == "InMemoryRelation" else None
+
+    advice = []
+    for node in walk(df._jdf.queryExecution().optimizedPlan()):
+        if node.nodeName() != "Filter": continue
+        relation = cached_relation_below(node.child())
+        if relation is None: continue
+
+        source_scans = [n for n in QueryPlans.nodes(__plan_to_tree(relation.cacheBuilder().cachedPlan())) if "Scan" in n["name"]]
+        source = next((s for s in source_scans if any(p in s["name"] for p in pushdown_sources)), None)
+        if source is None: continue  # The cached data does not come from a source that supports pushdown
+
+        condition = node.condition().sql()
+        output = [a.name() for a in seq(relation.output())]
+        cached_df = DataFrame(spark._jvm.org.apache.spark.sql.Dataset.ofRows(spark._jsparkSession, relation), spark)
+
+        # Reading the sample goes through the cache, materializing it if that has not happened yet
+        sample = cached_df.sample(fraction=sample_fraction, seed=42).agg(expr(f"avg(CASE WHEN {condition} THEN 1.0 ELSE 0.0 END)").alias("s")).first()
+        selectivity = float(sample.s) if sample.s is not None else 1.0
+
+        stats = relation.computeStats()
+        cache_bytes = int(stats.sizeInBytes().toString())
+        pushdown_bytes = int(cache_bytes * selectivity)
+
+        # Only the columns the query actually returns need to be cached
+        columns = [c for c in df.columns if c in output] or output
+        recommend = selectivity <= selectivity_threshold
+
+        advice.append({"condition": condition,
+                       "source": source["name"],
+                       "selectivity": round(selectivity, 4),
+                       "cache_scan_bytes": cache_bytes,
+                       "pushdown_scan_bytes_estimate": pushdown_bytes,
+                       "recommendation": (f"Cache the filtered projection instead: source_df.filter(\"{condition}\").select({', '.join(repr(c) for c in columns)}).cache()"
+                                          if recommend else "Filtering the cache is reasonable at this selectivity")})
+
+    if verbose:
+        if not advice: print("No filters over cached relations with a pushdown-capable source were found")
+        for a in advice:
+            print(f"Filter {a['condition']} keeps {a['selectivity']:.1%} of {a['source']}")
+            print(f"| scanning the cache reads ~{a['cache_scan_bytes']:,} bytes, pushing the filter down would return ~{a['pushdown_scan_bytes_estimate']:,} bytes")
+            print(f"| {a['recommendation']}")
+    
+    return advice
@@ -0,0 +1,153 @@
+# Databricks notebook source
+# A registry of the DataFrames cached through DA.cache(). For each entry it records the storage level, the size in memory
+# and on disk reported by the block manager, and when it was last accessed through DA.cached(). When the registered caches
+# exceed the memory budget (the "dbacademy.cache.budget" Spark configuration, in bytes) the least recently used entries are
+# unpersisted, and DA.cleanup() unpersists everything that is still registered. The budget is checked once a new entry has
+# been materialized, on every access and when the report is displayed, since an entry has no size before its first action.
+
+from collections import OrderedDict
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _cache_entries(self):
+    # Kept on the SparkSession rather than on DA so that caches registered by an earlier lesson's DA are not orphaned
+    if not hasattr(spark, "_dbacademy_cache_registry"):
+        spark._dbacademy_cache_registry = OrderedDict()
+    return spark._dbacademy_cache_registry
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _cached_rdd_id(self, df):
+    cached_data = spark._jsparkSession.sharedState().cacheManager().lookupCachedData(df._jdf)
+    if cached_data.isEmpty():
+        return None
+    return cached_data.get().cachedRepresentation().cacheBuilder().cachedColumnBuffers().id()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _cache_sizes(self):
+    sizes = {}
+    for info in spark.sparkContext._jsc.sc().getRDDStorageInfo():
+        sizes[info.id()] = {"memory_bytes": info.memSize(), "disk_bytes": info.diskSize(), "cached_partitions": info.numCachedPartitions()}
+    return sizes
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def cache(self, df, name=None, storage_level=None, materialize=False):
+    import time
+    from pyspark import StorageLevel
+
+    entries = self._cache_entries()
+    if name is None:
+        # A counter rather than len(entries), which would hand out the name of a live entry again after an eviction
+        spark._dbacademy_cache_counter = getattr(spark, "_dbacademy_cache_counter", -1) + 1
+        name = f"cache_{spark._dbacademy_cache_counter}"
+    if name in entries and entries[name]["df"] is not df:
+        self.uncache(name)
+    
+    df.persist(storage_level or StorageLevel.MEMORY_AND_DISK)
+    entries[name] = {"df": df, "storage_level": str(df.storageLevel), "registered_at": time.time(), "last_access": time.time()}
+    entries.move_to_end(name)
+
+    if materialize:
+        # Measured only once the entry is in the block manager; a lazy entry is counted from its first access through DA.cached()
+        df.count()
+        self.enforce_cache_budget()
+    return df
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def cached(self, name):
+    import time
+    entries = self._cache_entries()
+    entries[name]["last_access"] = time.time()
+    entries.move_to_end(name)
+    df = entries[name]["df"]
+    self.enforce_cache_budget()
+    return df
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def uncache(self, name):
+    entry = self._cache_entries().pop(name, None)
+    if entry is not None:
+        entry["df"].unpersist()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def get_cache_report(self):
+    sizes = self._cache_sizes()
+    report = []
+    for name, entry in self._cache_entries().items():
+        rdd_id = self._cached_rdd_id(entry["df"])
+        size = sizes.get(rdd_id, {"memory_bytes": 0, "disk_bytes": 0, "cached_partitions": 0})
+        report.append({"name": name, "storage_level": entry["storage_level"], "last_access": entry["last_access"], **size})
+    return report
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def display_cache_report(self):
+    from datetime import datetime
+    self.enforce_cache_budget()
+    rows = [(r["name"], r["storage_level"], r["memory_bytes"], r["disk_bytes"], r["cached_partitions"], datetime.fromtimestamp(r["last_access"])) for r in self.get_cache_report()]
+    display(spark.createDataFrame(rows, "name STRING, storage_level STRING, memory_bytes LONG, disk_bytes LONG, cached_partitions INT, last_access TIMESTAMP"))
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def enforce_cache_budget(self, budget_bytes=None):
+    budget = budget_bytes if budget_bytes is not None else spark.conf.get("dbacademy.cache.budget", None)
+    if budget is None:
+        return []
+    
+    report = {r["name"]: r for r in self.get_cache_report()}
+    in_memory = sum(r["memory_bytes"] for r in report.values())
+    evicted = []
+
+    # The registry is kept in access order, so the least recently used entries come first
+    for name in list(self._cache_entries().keys()):
+        if in_memory <= int(budget): break
+        in_memory -= report[name]["memory_bytes"]
+        self.uncache(name)
+        evicted.append(name)
+
+    if evicted:
+        print(f"Evicted {len(evicted)} cached DataFrame(s) to stay within the {int(budget):,} byte cache budget: {', '.join(evicted)}")
+    return evicted
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def uncache_all(self):
+    names = list(self._cache_entries().keys())
+    for name in names:
+        self.uncache(name)
+    return names
+
+# COMMAND ----------
+
+def __uncache_on_cleanup():
+    import functools
+
+    cleanup = DBAcademyHelper.cleanup
+    if getattr(cleanup, "_dbacademy_cache_registry", False):
+        return  # Already wrapped by an earlier %run in this interpreter
+
+    @functools.wraps(cleanup)
+    def wrapped_cleanup(self, *args, **kwargs):
+        names = self.uncache_all()
+        if names: print(f"Unpersisted {len(names)} cached DataFrame(s): {', '.join(names)}")
+        return cleanup(self, *args, **kwargs)
+
+    wrapped_cleanup._dbacademy_cache_registry = True
+    DBAcademyHelper.monkey_patch(wrapped_cleanup)
+
+__uncache_on_cleanup()
@@ -0,0 +1,117 @@
+# Databricks notebook source
+# Measures the Parquet compression codecs on the course tables and picks one per table. Every candidate writes the same
+# DataFrame and reads it back with a full scan; the resulting size, write throughput and read throughput are combined in a
+# weighted cost. The default weights favour size and scan I/O over CPU. Selections are persisted, so that later writes
+# through DA.write_with_codec() use the table's codec without having to benchmark again.
+# Opt-in: not loaded by _common; use %run ../Includes/_codec_benchmark after the classroom setup.
+
+# COMMAND ----------
+
+# MAGIC %run ./_format_benchmark
+
+# COMMAND ----------
+
+# (codec, zstd level) pairs; the level is ignored by the other codecs
+codec_benchmark_candidates = [("snappy", None), ("zstd", 1), ("zstd", 3), ("zstd", 9), ("gzip", None), ("lz4", None)]
+
+codec_benchmark_tables = ["users.delta", "events.delta", "sales.delta", "products.delta"]
+
+# Relative weight of each cost; every cost is normalized to the best candidate for the table, so 1.0 is the best possible
+codec_cost_weights = {"size": 0.6, "read": 0.3, "write": 0.1}
+
+# COMMAND ----------
+
+def __codec_label(codec, level):
+    return codec if level is None else f"{codec}-{level}"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _codec_selection_path(self):
+    return spark.conf.get("dbacademy.codec.selection", f"{self.paths.datasets.rstrip('/')}.codec-selection.json")
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def load_codec_selection(self):
+    import json
+    try:
+        return json.loads(dbutils.fs.head(self._codec_selection_path(), 16*1024*1024))
+    except Exception:
+        return {}  # Nothing has been benchmarked yet
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _codec_writer(self, df, codec, level, format="parquet", mode="overwrite"):
+    writer = df.write.format(format).mode(mode).option("compression", codec)
+    if codec == "zstd" and level is not None:
+        writer = writer.option("parquet.compression.codec.zstd.level", str(level))  # Handed to the Parquet writer's Hadoop configuration
+    return writer
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def benchmark_codecs(self, tables=None, candidates=None, format="parquet", weights=None, apply=False, display_results=True):
+    import time
+
+    tables = tables or codec_benchmark_tables
+    candidates = candidates or codec_benchmark_candidates
+    weights = weights or codec_cost_weights
+    base_dir = f"{self.paths.working_dir}/codec_benchmark"
+    results = []
+
+    for table in tables:
+        # Tables are given either by dataset name or as {name: DataFrame}
+        name, df = (table, self.read_dataset(table)) if isinstance(table, str) else next(iter(table.items()))
+        df = self.cache(df, name=f"codec_benchmark_{name}", materialize=True)  # So that the source read is not part of the write timings
+        rows = df.count()
+        table_results = []
+
+        for codec, level in candidates:
+            label = __codec_label(codec, level)
+            path = f"{base_dir}/{name}/{label}"
+            print(f"Benchmarking {label} on {name}", end="...")
+
+            start = time.perf_counter()
+            self._codec_writer(df, codec, level, format).save(path)
+            write_seconds = time.perf_counter() - start
+
+            size = sum(s for s, _ in self._list_data_files(path).values())
+            read_seconds = self._run_scan_benchmark(spark.read.format(format).load(path))["seconds"]
+
+            table_results.append({"table": name, "codec": label, "size_in_bytes": size, "write_seconds": round(write_seconds, 4), "read_seconds": read_seconds,
+                                  "write_mb_per_second": round(size / 1024**2 / write_seconds, 2), "read_mb_per_second": round(size / 1024**2 / read_seconds, 2),
+                                  "write_rows_per_second": int(rows / write_seconds), "read_rows_per_second": int(rows / read_seconds)})
+            print(f"({size:,} bytes, {write_seconds:.2f}s write, {read_seconds:.2f}s read)")
+
+        best = {"size": min(r["size_in_bytes"] for r in table_results), "read": min(r["read_seconds"] for r in table_results), "write": min(r["write_seconds"] for r in table_results)}
+        for r in table_results:
+            r["cost"] = round(weights["size"] * r["size_in_bytes"] / best["size"] + weights["read"] * r["read_seconds"] / best["read"] + weights["write"] * r["write_seconds"] / best["write"], 4)
+            r["recommended"] = False
+        min(table_results, key=lambda r: r["cost"])["recommended"] = True
+
+        results.extend(table_results)
+        self.uncache(f"codec_benchmark_{name}")
+        dbutils.fs.rm(f"{base_dir}/{name}", True)
+
+    recommendations = {r["table"]: r["codec"] for r in results if r["recommended"]}
+    if apply:
+        import json
+        dbutils.fs.put(self._codec_selection_path(), json.dumps({**self.load_codec_selection(), **recommendations}, indent=2, sort_keys=True), True)
+        print(f"Saved codec selections: {recommendations}")
+
+    if display_results:
+        schema = "table STRING, codec STRING, size_in_bytes LONG, write_seconds DOUBLE, read_seconds DOUBLE, write_mb_per_second DOUBLE, read_mb_per_second DOUBLE, write_rows_per_second LONG, read_rows_per_second LONG, cost DOUBLE, recommended BOOLEAN"
+        display(spark.createDataFrame([tuple(r.values()) for r in results], schema))
+
+    return {"results": results, "recommendations": recommendations}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def write_with_codec(self, df, path, table, format="parquet", mode="overwrite", default="snappy"):
+    label = self.load_codec_selection().get(table, default)
+    codec, _, level = label.partition("-")
+    self._codec_writer(df, codec, int(level) if level else None, format, mode).save(path)
+    return label
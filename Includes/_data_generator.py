@@ -0,0 +1,213 @@
+# Databricks notebook source
+# Synthetic, scalable versions of the BedBricks datasets for benchmarking. Rows are derived from spark.range() with hash-based
+# pseudo-random values, so generation is fully parallel, needs no network access and is reproducible for a given seed.
+# Key relationships are preserved: events.user_id and sales.email always refer to an existing user, and every item_id in
+# events and sales refers to an existing product. A skew > 0 concentrates events and sales on a small set of "hot" users.
+# Opt-in: not loaded by _common; use %run ../Includes/_data_generator after the classroom setup.
+
+# The events schema is the DDL-formatted equivalent of the nested user_defined_schema from ASP 2.2 (with the field names
+# found in the actual dataset); the sales items reuse the same item structure.
+generator_item_ddl = "ARRAY<STRUCT<`coupon`: STRING, `item_id`: STRING, `item_name`: STRING, `item_revenue_in_usd`: DOUBLE, `price_in_usd`: DOUBLE, `quantity`: BIGINT>>"
+
+generator_schemas = {
+    "events": "`device` STRING,`ecommerce` STRUCT<`purchase_revenue_in_usd`: DOUBLE, `total_item_quantity`: BIGINT, `unique_items`: BIGINT>,`event_name` STRING,`event_previous_timestamp` BIGINT,`event_timestamp` BIGINT,`geo` STRUCT<`city`: STRING, `state`: STRING>,`items` " + generator_item_ddl + ",`traffic_source` STRING,`user_first_touch_timestamp` BIGINT,`user_id` STRING",
+    "sales": "`order_id` BIGINT,`email` STRING,`transaction_timestamp` BIGINT,`total_item_quantity` BIGINT,`purchase_revenue_in_usd` DOUBLE,`unique_items` BIGINT,`items` " + generator_item_ddl,
+    "users": "`user_id` STRING,`user_first_touch_timestamp` BIGINT,`email` STRING",
+    "products": "`item_id` STRING,`name` STRING,`price` DOUBLE",
+    "people": "`firstName` STRING,`middleName` STRING,`lastName` STRING,`gender` STRING,`birthDate` TIMESTAMP,`salary` INT,`ssn` STRING",
+}
+
+# Row counts at scale factor 1, roughly the size of the shipped datasets
+generator_base_counts = {"events": 500_000, "sales": 200_000, "users": 500_000, "products": 12, "people": 100_000}
+
+# Like people-with-dups.txt, a fraction of the people are repeated with a different case and without the hyphens in the SSN
+generator_people_dup_fraction = 0.03
+
+generator_values = {
+    "device": ["macOS", "Windows", "iOS", "Android", "Linux", "Chrome OS"],
+    "event_name": ["main", "cart", "checkout", "finalize", "add_item", "view", "original", "reviews", "register", "email_coupon", "cc_info", "delivery", "shipping_info", "press", "warranty", "mattresses", "pillows", "careers", "guest", "faq"],
+    "traffic_source": ["google", "facebook", "instagram", "youtube", "email", "direct"],
+    "coupon": ["NEWBED10", "NEWBED20", "BLACKFRIDAY", "BLANKET"],
+    "city": ["Houston", "Chicago", "Los Angeles", "New York", "Phoenix", "Seattle", "Denver", "Atlanta", "Boston", "Miami"],
+    "state": ["TX", "IL", "CA", "NY", "AZ", "WA", "CO", "GA", "MA", "FL"],
+    "first_name": ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica"],
+    "last_name": ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas"],
+    "product": ["Standard", "Premium", "King", "Queen", "Twin", "Full", "Foam", "Down", "Cotton", "Linen", "Hybrid", "Memory"],
+}
+
+# Microsecond timestamps spanning the same weeks as the original data
+generator_start_micros = 1592179200000000
+generator_span_micros = 21 * 24 * 60 * 60 * 1000000
+
+# COMMAND ----------
+
+def __uniform(seed, *keys):
+    from pyspark.sql.functions import lit, pmod, xxhash64
+    # A reproducible value in [0, 1) for the given keys
+    return pmod(xxhash64(lit(seed), *keys), lit(1000000007)) / lit(1000000007.0)
+
+def __pick(values, u):
+    from pyspark.sql.functions import array, floor, lit
+    return array(*[lit(v) for v in values])[floor(u * len(values)).cast("int")]
+
+def __skewed_index(count, u, skew):
+    from pyspark.sql.functions import floor, lit, pow
+    # skew == 0 is uniform; larger values concentrate the selection on the lowest indexes
+    return floor(pow(u, lit(1.0 + skew)) * count).cast("long")
+
+def __user_id(index):
+    from pyspark.sql.functions import concat, lit, lpad
+    return concat(lit("UA"), lpad(index.cast("string"), 15, "0"))
+
+def __user_email(index):
+    from pyspark.sql.functions import concat, lit
+    return concat(lit("user"), index.cast("string"), lit("@bedbricks.example.com"))
+
+def __item_id(index):
+    from pyspark.sql.functions import concat, lit, lpad
+    return concat(lit("P_"), lpad(index.cast("string"), 8, "0"))
+
+def __first_touch(index, seed):
+    from pyspark.sql.functions import lit
+    return (lit(generator_start_micros) + __uniform(seed, lit("first_touch"), index) * generator_span_micros).cast("long")
+
+def __conform(df, ddl):
+    from pyspark.sql.functions import col
+    schema = spark.createDataFrame([], ddl).schema
+    return df.select(*[col(f.name).cast(f.dataType).alias(f.name) for f in schema.fields])
+
+def __items(seed, key, product_count, item_count, skew):
+    from pyspark.sql.functions import lit, round, sequence, slice, struct, transform, when
+    
+    def item(i):
+        product = __skewed_index(product_count, __uniform(seed, lit("item"), key, i), skew)
+        price = __product_price(product, seed)
+        quantity = (__uniform(seed, lit("quantity"), key, i) * 3).cast("long") + 1
+        has_coupon = __uniform(seed, lit("has_coupon"), key, i) < 0.2
+        return struct(when(has_coupon, __pick(generator_values["coupon"], __uniform(seed, lit("coupon"), key, i))).alias("coupon"),
+                      __item_id(product).alias("item_id"),
+                      __product_name(product).alias("item_name"),
+                      round(price * quantity * when(has_coupon, 0.9).otherwise(1.0), 2).alias("item_revenue_in_usd"),
+                      price.alias("price_in_usd"),
+                      quantity.alias("quantity"))
+    
+    return slice(transform(sequence(lit(1), lit(5)), item), 1, item_count)
+
+def __product_name(index):
+    from pyspark.sql.functions import concat_ws
+    names = generator_values["product"]
+    return concat_ws(" ", __pick(names, (index % len(names)) / len(names)), __pick(names, ((index / len(names)).cast("long") % len(names)) / len(names)), (index / (len(names)**2)).cast("long").cast("string"))
+
+def __product_price(index, seed):
+    from pyspark.sql.functions import lit, round
+    return round(lit(50.0) + __uniform(seed, lit("price"), index) * 2000, 2)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def generate_dataset(self, name, scale_factor=1, skew=0.0, seed=42, num_partitions=None):
+    from pyspark.sql.functions import aggregate, array, col, concat_ws, floor, lit, lpad, size, struct, substring, translate, upper, when
+
+    counts = {k: max(1, int(v * scale_factor)) for k, v in generator_base_counts.items()}
+    rows = counts[name]
+    num_partitions = num_partitions or max(spark.sparkContext.defaultParallelism, rows // 1000000)
+    
+    df = spark.range(0, rows, 1, num_partitions)
+    u = lambda key: __uniform(seed, lit(name), lit(key), col("id"))
+
+    if name == "users":
+        df = df.select(__user_id(col("id")).alias("user_id"), 
+                       __first_touch(col("id"), seed).alias("user_first_touch_timestamp"), 
+                       __user_email(col("id")).alias("email"))
+
+    elif name == "products":
+        df = df.select(__item_id(col("id")).alias("item_id"), 
+                       __product_name(col("id")).alias("name"), 
+                       __product_price(col("id"), seed).alias("price"))
+
+    elif name == "sales":
+        user = __skewed_index(counts["users"], u("user"), skew)
+        df = (df.withColumn("items", __items(seed, col("id"), counts["products"], (u("item_count") * 4).cast("int") + 1, skew))
+                .select(col("id").alias("order_id"),
+                        __user_email(user).alias("email"),
+                        (lit(generator_start_micros) + u("timestamp") * generator_span_micros).cast("long").alias("transaction_timestamp"),
+                        aggregate(col("items"), lit(0).cast("long"), lambda acc, i: acc + i.quantity).alias("total_item_quantity"),
+                        aggregate(col("items"), lit(0.0), lambda acc, i: acc + i.item_revenue_in_usd).alias("purchase_revenue_in_usd"),
+                        size(col("items")).alias("unique_items"),
+                        col("items")))
+
+    elif name == "events":
+        user = __skewed_index(counts["users"], u("user"), skew)
+        timestamp = (lit(generator_start_micros) + u("timestamp") * generator_span_micros).cast("long")
+        location = floor(u("geo") * len(generator_values["city"])).cast("int")
+        
+        df = (df.withColumn("event_name", __pick(generator_values["event_name"], u("event_name")))
+                .withColumn("item_count", when(col("event_name").isin("cart", "checkout", "finalize", "add_item"), (u("item_count") * 4).cast("int") + 1).otherwise(0))
+                .withColumn("items", __items(seed, col("id"), counts["products"], col("item_count"), skew))
+                .select(__pick(generator_values["device"], u("device")).alias("device"),
+                        when(col("event_name") == "finalize", 
+                             struct(aggregate(col("items"), lit(0.0), lambda acc, i: acc + i.item_revenue_in_usd).alias("purchase_revenue_in_usd"),
+                                    aggregate(col("items"), lit(0).cast("long"), lambda acc, i: acc + i.quantity).alias("total_item_quantity"),
+                                    size(col("items")).alias("unique_items"))).alias("ecommerce"),
+                        col("event_name"),
+                        when(u("has_previous") < 0.8, timestamp - (u("previous") * 3600000000).cast("long")).alias("event_previous_timestamp"),
+                        timestamp.alias("event_timestamp"),
+                        struct(array(*[lit(c) for c in generator_values["city"]])[location].alias("city"),
+                               array(*[lit(s) for s in generator_values["state"]])[location].alias("state")).alias("geo"),
+                        col("items"),
+                        __pick(generator_values["traffic_source"], u("traffic_source")).alias("traffic_source"),
+                        __first_touch(user, seed).alias("user_first_touch_timestamp"),
+                        __user_id(user).alias("user_id")))
+
+    elif name == "people":
+        unique = counts["people"]
+        df = spark.range(0, unique + int(unique * generator_people_dup_fraction), 1, num_partitions)
+        is_dup = col("id") >= unique
+        person = when(is_dup, __skewed_index(unique, u("duplicate_of"), skew)).otherwise(col("id"))
+        p = lambda key: __uniform(seed, lit("person"), lit(key), person)
+        ssn = lpad(person.cast("string"), 9, "0")
+        
+        df = df.select(__pick(generator_values["first_name"], p("first")).alias("firstName"),
+                       __pick(generator_values["first_name"], p("middle")).alias("middleName"),
+                       __pick(generator_values["last_name"], p("last")).alias("lastName"),
+                       when(p("gender") < 0.5, "F").otherwise("M").alias("gender"),
+                       (lit(-631152000) + (p("birth") * 1262304000).cast("long")).cast("timestamp").alias("birthDate"),
+                       (lit(20000) + p("salary") * 180000).cast("int").alias("salary"),
+                       concat_ws("-", substring(ssn, 1, 3), substring(ssn, 4, 2), substring(ssn, 6, 4)).alias("ssn"),
+                       is_dup.alias("is_dup"))
+        
+        # Duplicates only differ in the case of the names and in the formatting of the SSN
+        df = df.select(*[when(col("is_dup") & (u(c) < 0.5), upper(col(c))).otherwise(col(c)).alias(c) for c in ["firstName", "middleName", "lastName"]],
+                       col("gender"), col("birthDate"), col("salary"),
+                       when(col("is_dup") & (u("ssn") < 0.5), translate(col("ssn"), "-", "")).otherwise(col("ssn")).alias("ssn"))
+
+    else:
+        raise ValueError(f"Unknown dataset \"{name}\", expected one of {list(generator_schemas.keys())}")
+
+    return __conform(df, generator_schemas[name])
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def generate_datasets(self, scale_factor=10, skew=0.0, seed=42, path=None, names=None):
+    import time
+
+    path = path or f"{self.paths.working_dir}/generated/x{scale_factor}"
+    names = names or ["users", "products", "sales", "events", "people"]
+    results = {}
+
+    for name in names:
+        start = time.time()
+        print(f"Generating {name} at {scale_factor}x", end="...")
+        
+        (self.generate_dataset(name, scale_factor=scale_factor, skew=skew, seed=seed)
+             .write
+             .format("delta")
+             .mode("overwrite")
+             .option("overwriteSchema", True)
+             .save(f"{path}/{name}.delta"))
+        
+        results[name] = {"path": f"{path}/{name}.delta", "seconds": round(time.time()-start, 3)}
+        print(f"({int(time.time()-start)} seconds)")
+
+    return results
@@ -0,0 +1,153 @@
+# Databricks notebook source
+# The stock installer re-copies every entry in remote_files whenever installing_datasets is on. This version keeps a manifest
+# of what was copied (size, modification time & MD5 of the local copy) next to the datasets directory and only copies files
+# that are missing or changed. The manifest is flushed as files complete, so an interrupted install resumes where it stopped.
+
+@DBAcademyHelper.monkey_patch
+def _install_manifest_path(self):
+    return f"{self.paths.datasets.rstrip('/')}.install-manifest.json"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _load_install_manifest(self):
+    import json
+    try:
+        manifest = json.loads(dbutils.fs.head(self._install_manifest_path(), 16*1024*1024))
+    except Exception:
+        return {}  # No manifest yet, or an unreadable one; either way everything is treated as missing
+    
+    expected = f"{self.course_config.data_source_name}/{self.course_config.data_source_version}"
+    return manifest.get("files", {}) if manifest.get("data_source") == expected else {}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _save_install_manifest(self, files):
+    import json
+    manifest = {
+        "data_source": f"{self.course_config.data_source_name}/{self.course_config.data_source_version}",
+        "files": files,
+    }
+    dbutils.fs.put(self._install_manifest_path(), json.dumps(manifest, indent=1, sort_keys=True), True)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _local_file_md5(self, path):
+    import hashlib, os
+
+    # Hashing goes through the FUSE mount; when it is not available we fall back to size-only verification
+    local_path = "/dbfs/" + path[len("dbfs:/"):] if path.startswith("dbfs:/") else path
+    if not os.path.isfile(local_path):
+        return None
+    
+    md5 = hashlib.md5()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4*1024*1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _list_dataset_files(self, root, max_workers, missing_ok=False):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # One listing per directory is far cheaper than one stat per file
+    directories = sorted({f[:f.rindex("/")+1] for f in self.course_config.remote_files if not f.endswith("/")})
+
+    def list_directory(directory):
+        try:
+            return [(directory + f.name, f) for f in dbutils.fs.ls(root + directory) if not f.isDir()]
+        except Exception:
+            if not missing_ok: raise
+            return []  # A local directory that does not exist (yet) simply has no files
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return {name: info for listing in executor.map(list_directory, directories) for name, info in listing}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _list_remote_files(self, max_workers):
+    # Listing errors are not swallowed here: an unreachable source must fail the install rather than look empty
+    remote = self._list_dataset_files(self.data_source_uri.rstrip("/"), max_workers)
+
+    missing = [f for f in self.course_config.remote_files if not f.endswith("/") and f not in remote]
+    assert not missing, f"{len(missing)} dataset file(s) are missing from \"{self.data_source_uri}\": {missing[:10]}"
+    return remote
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def install_datasets(self, reinstall_datasets=False, max_workers=8, verify_checksums=False):
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    start = time.time()
+    source = self.data_source_uri.rstrip("/")
+    target = self.paths.datasets.rstrip("/")
+
+    print(f"Installing datasets incrementally...")
+    print(f"| from \"{source}\"")
+    print(f"| to \"{target}\"")
+
+    manifest = {} if reinstall_datasets else self._load_install_manifest()
+    remote = self._list_remote_files(max_workers)
+
+    # The manifest lives outside the datasets directory, so the local copies are listed too in case they were deleted
+    local = self._list_dataset_files(target, max_workers, missing_ok=True)
+
+    for directory in [f for f in self.course_config.remote_files if f.endswith("/")]:
+        dbutils.fs.mkdirs(target + directory)
+
+    def is_current(name, info):
+        entry = manifest.get(name)
+        if entry is None or entry.get("size") != info.size or entry.get("modification_time") != getattr(info, "modificationTime", None):
+            return False
+        if name not in local or local[name].size != info.size:
+            return False
+        if verify_checksums and entry.get("md5") is not None:
+            return self._local_file_md5(target + name) == entry["md5"]
+        return True
+
+    pending = [name for name, info in remote.items() if not is_current(name, info)]
+    print(f"| {len(remote)-len(pending)} of {len(remote)} files are up to date, copying {len(pending)}", end="...")
+
+    failures = {}
+
+    def copy_file(name):
+        info = remote[name]
+        dbutils.fs.cp(source + name, target + name)
+
+        copied = dbutils.fs.ls(target + name)
+        if len(copied) != 1 or copied[0].size != info.size:
+            raise AssertionError(f"Size mismatch after copying \"{name}\"")
+
+        return {"size": info.size, "modification_time": getattr(info, "modificationTime", None), "md5": self._local_file_md5(target + name)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(copy_file, name): name for name in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                entry = future.result()
+                manifest[name] = entry
+            except Exception as e:
+                failures[name] = str(e)
+                manifest.pop(name, None)
+
+            # Flush periodically so that an interrupted install can resume from here
+            if i % 25 == 0:
+                self._save_install_manifest(manifest)
+
+    # Drop entries that are no longer part of the dataset
+    manifest = {name: entry for name, entry in manifest.items() if name in remote}
+    self._save_install_manifest(manifest)
+
+    print(f"({int(time.time()-start)} seconds)")
+    
+    assert not failures, f"Unable to install {len(failures)} dataset file(s): {failures}"
+
+    return {"copied": len(pending), "skipped": len(remote)-len(pending), "seconds": round(time.time()-start, 3)}
@@ -0,0 +1,101 @@
+# Databricks notebook source
+# Answers "is this Delta, how many files, how many records" from the transaction log instead of scanning the data. The log is
+# replayed from the last checkpoint (if any) and the numRecords statistic of each live add action is summed. A scan is only
+# needed when a file was written without statistics.
+
+@DBAcademyHelper.monkey_patch
+def _read_text_file(self, path):
+    import os
+    local_path = "/dbfs/" + path[len("dbfs:/"):] if path.startswith("dbfs:/") else path
+    if os.path.isfile(local_path):
+        with open(local_path) as f: return f.read()
+    return dbutils.fs.head(path, 1024*1024*1024)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def read_delta_log(self, path):
+    import json, re
+
+    log_path = f"{path.rstrip('/')}/_delta_log"
+    try:
+        log_files = {f.name: f.path for f in dbutils.fs.ls(log_path)}
+    except Exception:
+        return None  # No transaction log; this is not a Delta table
+
+    files, metadata, checkpoint_version = {}, {}, -1
+
+    if "_last_checkpoint" in log_files:
+        checkpoint_version = json.loads(self._read_text_file(log_files["_last_checkpoint"]))["version"]
+        checkpoint_files = [p for n, p in log_files.items() if n.startswith(f"{checkpoint_version:020d}.checkpoint") and n.endswith(".parquet")]
+        
+        for row in spark.read.parquet(*checkpoint_files).where("add IS NOT NULL OR metaData IS NOT NULL").select("add", "metaData").collect():
+            if row.add is not None:
+                files[row.add.path] = {"size": row.add.size, "stats": row.add.stats, "partition_values": dict(row.add.partitionValues or {})}
+            if row.metaData is not None:
+                metadata = {"format": row.metaData.format.provider, "schema_string": row.metaData.schemaString, "partition_columns": list(row.metaData.partitionColumns)}
+
+    commits = sorted((int(n[:20]), p) for n, p in log_files.items() if re.fullmatch(r"\d{20}\.json", n))
+    for version, commit_path in commits:
+        if version <= checkpoint_version: continue
+        for line in self._read_text_file(commit_path).splitlines():
+            if not line.strip(): continue
+            action = json.loads(line)
+            if "add" in action:
+                add = action["add"]
+                files[add["path"]] = {"size": add.get("size"), "stats": add.get("stats"), "partition_values": add.get("partitionValues", {})}
+            elif "remove" in action:
+                files.pop(action["remove"]["path"], None)
+            elif "metaData" in action:
+                m = action["metaData"]
+                metadata = {"format": m.get("format", {}).get("provider"), "schema_string": m.get("schemaString"), "partition_columns": m.get("partitionColumns", [])}
+
+    for entry in files.values():
+        stats = json.loads(entry.pop("stats")) if entry.get("stats") else {}
+        entry["num_records"] = stats.get("numRecords")
+
+    version = max([v for v, _ in commits] + [checkpoint_version])
+    return {"version": version, "files": files, "metadata": metadata}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def describe_delta_output(self, path):
+    log = self.read_delta_log(path)
+    if log is None:
+        return {"is_delta": False, "num_files": 0, "num_records": None, "size_in_bytes": 0}
+
+    records = [f["num_records"] for f in log["files"].values()]
+    num_records = sum(records) if None not in records else None
+
+    if num_records is None:
+        # At least one file was written without statistics, so only a scan can tell
+        num_records = spark.read.format("delta").load(path).count()
+
+    return {"is_delta": True,
+            "version": log["version"],
+            "num_files": len(log["files"]),
+            "num_records": num_records,
+            "size_in_bytes": sum(f["size"] or 0 for f in log["files"].values()),
+            "partition_columns": log["metadata"].get("partition_columns", [])}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def count_records(self, path):
+    return self.describe_delta_output(path)["num_records"]
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def verify_delta_output(self, path, expected_records=None, expected_files=None):
+    description = self.describe_delta_output(path)
+
+    assert description["is_delta"], "Data not written in Delta format"
+    assert description["num_files"] > 0, "No data written"
+    if expected_files is not None:
+        assert description["num_files"] == expected_files, f"Expected {expected_files} data file{'s' if expected_files != 1 else ''} written"
+    if expected_records is not None:
+        assert description["num_records"] == expected_records, f"Expected {expected_records} records in final result"
+
+    return description
@@ -0,0 +1,47 @@
+# Databricks notebook source
+# Writes Delta output in parallel and then bin-packs it into files of a target size, instead of funnelling the whole write
+# through a single task with repartition(1). The compaction is an OPTIMIZE, so it is recorded in the transaction log: the
+# live files of the latest version are the compacted ones, which DA.describe_delta_output() and DA.verify_delta_output()
+# read from the log. The pre-compaction files stay on disk for time travel until they are vacuumed.
+
+delta_writer_target_file_bytes = 128 * 1024 * 1024
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def write_delta(self, df, path, target_file_bytes=None, max_files=None, mode="overwrite", partition_by=None, vacuum=False):
+    import math
+
+    writer = df.write.format("delta").mode(mode)
+    if partition_by: writer = writer.partitionBy(*partition_by)
+    writer.save(path)
+
+    written = self.describe_delta_output(path)
+    target_file_bytes = int(target_file_bytes or spark.conf.get("dbacademy.delta.targetFileBytes", str(delta_writer_target_file_bytes)))
+
+    if max_files is not None:
+        # Raising the bin size until the table fits in max_files bins; a little slack keeps greedy packing from spilling over
+        target_file_bytes = max(target_file_bytes, math.ceil(written["size_in_bytes"] / max_files * 1.1) + 1)
+        if max_files == 1: target_file_bytes = max(target_file_bytes, 2 * written["size_in_bytes"] + 1)
+
+    previous = {k: spark.conf.get(k, None) for k in ["spark.databricks.delta.optimize.maxFileSize", "spark.databricks.delta.optimize.minFileSize"]}
+    try:
+        # Every file below the target is a compaction candidate, and the bins are filled up to the target
+        for key in previous: spark.conf.set(key, str(target_file_bytes))
+        spark.sql(f"OPTIMIZE delta.`{path}`")
+    finally:
+        for key, value in previous.items():
+            if value is None: spark.conf.unset(key)
+            else: spark.conf.set(key, value)
+
+    if vacuum:
+        # Only safe for output nobody else is reading yet, as it removes the files that earlier versions still refer to
+        retention_check = spark.conf.get("spark.databricks.delta.retentionDurationCheck.enabled", "true")
+        spark.conf.set("spark.databricks.delta.retentionDurationCheck.enabled", "false")
+        try: spark.sql(f"VACUUM delta.`{path}` RETAIN 0 HOURS")
+        finally: spark.conf.set("spark.databricks.delta.retentionDurationCheck.enabled", retention_check)
+
+    compacted = self.describe_delta_output(path)
+    compacted["files_written"] = written["num_files"]
+    compacted["target_file_bytes"] = target_file_bytes
+    return compacted
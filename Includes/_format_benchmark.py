@@ -0,0 +1,165 @@
+# Databricks notebook source
+# Runs the same projection, filter and aggregation against every copy of a dataset (JSON, CSV, Parquet and Delta) and reports, per
+# format and query, the wall-clock time, the executor run time and bytes read of its stages, and the scan metrics of the
+# executed plan: files opened and how many of the dataset's files were pruned. Queries are executed inside the JVM, so no
+# rows are sent to Python.
+# Opt-in: not loaded by _common; use %run ../Includes/_format_benchmark after the classroom setup.
+
+format_benchmark_datasets = {
+    "events": ["events-500k.json", "events-1m.json", "events.parquet", "events.delta"],
+    "sales": ["sales.parquet", "sales.delta"],
+    "users": ["users-500k.csv", "users.delta"],
+    "products": ["products.csv", "products.delta"],
+}
+
+# The filters are selective on a column that the columnar copies keep statistics for, so they show data skipping as well
+format_benchmark_queries = {
+    "events": {
+        "projection": lambda df: df.select("user_id", "event_timestamp"),
+        "filter": lambda df: df.where("event_timestamp >= 1593878400000000 AND event_name = 'finalize'").select("user_id", "event_timestamp"),
+        "aggregation": lambda df: df.groupBy("traffic_source", "device").count(),
+    },
+    "sales": {
+        "projection": lambda df: df.select("order_id", "purchase_revenue_in_usd"),
+        "filter": lambda df: df.where("purchase_revenue_in_usd > 2000").select("order_id", "email"),
+        "aggregation": lambda df: df.groupBy("unique_items").agg({"purchase_revenue_in_usd": "sum", "order_id": "count"}),
+    },
+    "users": {
+        "projection": lambda df: df.select("user_id", "email"),
+        "filter": lambda df: df.where("user_first_touch_timestamp >= 1593878400000000").select("user_id", "email"),
+        "aggregation": lambda df: df.selectExpr("substring_index(email, '@', -1) AS domain").groupBy("domain").count(),
+    },
+    "products": {
+        "projection": lambda df: df.select("item_id", "price"),
+        "filter": lambda df: df.where("price > 1000").select("item_id", "name"),
+        "aggregation": lambda df: df.selectExpr("left(item_id, 1) AS category", "price").groupBy("category").agg({"price": "avg"}),
+    },
+}
+
+# SQL metrics of the scan nodes, summed over all scans in the plan. Time and bytes come from the stages' task metrics instead:
+# scanTime is only reported by columnar scans, and filesSize is the size of the selected files rather than the bytes read.
+format_benchmark_metrics = {"numFiles": "files_read", "metadataTime": "metadata_time_ms", "numOutputRows": "rows_scanned"}
+
+# COMMAND ----------
+
+def __scan_metrics(node):
+    totals = {}
+    if node.nodeName() == "AdaptiveSparkPlan":
+        node = node.executedPlan()
+
+    if "Scan" in node.nodeName():
+        metrics = node.metrics()
+        for metric, name in format_benchmark_metrics.items():
+            value = metrics.get(metric)
+            if value.isDefined(): totals[name] = totals.get(name, 0) + value.get().value()
+
+    # Query stages of an adaptive plan are inner children rather than children
+    for children in (node.children(), node.innerChildren()):
+        for i in range(children.size()):
+            for name, value in __scan_metrics(children.apply(i)).items():
+                totals[name] = totals.get(name, 0) + value
+    return totals
+
+# COMMAND ----------
+
+def __fetch_ui_json(path):
+    import json, urllib.request
+    app_id = spark.sparkContext.applicationId
+    with urllib.request.urlopen(f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{app_id}/{path}") as response:
+        return json.loads(response.read())
+
+def __stage_metrics(job_group):
+    import time
+
+    # The UI's status store is fed asynchronously by the listener bus; wait until it has caught up with the tracker
+    job_ids = spark.sparkContext.statusTracker().getJobIdsForGroup(job_group)
+    for _ in range(50):
+        jobs = [j for j in __fetch_ui_json("jobs") if j["jobId"] in job_ids]
+        if len(jobs) == len(job_ids) and all(j["status"] != "RUNNING" for j in jobs): break
+        time.sleep(0.1)
+
+    stage_ids = sorted({s for j in jobs for s in j["stageIds"]})
+    stages = [attempt for s in stage_ids for attempt in __fetch_ui_json(f"stages/{s}") if attempt["status"] == "COMPLETE"]
+    return {"executor_run_time_ms": sum(s["executorRunTime"] for s in stages), "bytes_read": sum(s["inputBytes"] for s in stages)}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _run_scan_benchmark(self, df):
+    import time
+
+    # toRdd() executes the physical plan without converting any rows, and leaves its metrics on the executed plan
+    qe = df._jdf.queryExecution()
+    sc = spark.sparkContext
+    previous_group = sc.getLocalProperty("spark.jobGroup.id")
+    previous_description = sc.getLocalProperty("spark.job.description")
+    job_group = f"format-benchmark-{time.time_ns()}"
+    sc.setJobGroup(job_group, "Format benchmark")
+    try:
+        start = time.perf_counter()
+        qe.toRdd().count()
+        seconds = time.perf_counter() - start
+    finally:
+        sc.setLocalProperty("spark.jobGroup.id", previous_group)
+        sc.setLocalProperty("spark.job.description", previous_description)
+    return {"seconds": round(seconds, 4), **__stage_metrics(job_group), **__scan_metrics(qe.executedPlan())}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _format_benchmark_reader(self, name):
+    manifest = DatasetManifest(dataset_index)
+    entry = manifest[name]
+    path = f"{self.paths.datasets}/{manifest.resolve(name)}"
+
+    if entry["format"] == "delta":
+        total_files = self.describe_delta_output(path)["num_files"]
+    else:
+        total_files = len(self._list_data_files(path))
+
+    # JSON and CSV are read with their registered schema so that the benchmark does not time schema inference
+    options = dataset_reader_options.get(manifest.resolve(name), {})
+    schema = self.get_schema(path, entry["format"], **options) if entry["format"] in ("json", "csv") else None
+    return (lambda: self.read_dataset(name, schema)), entry["format"], total_files
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def benchmark_formats(self, datasets=None, runs=3, disable_disk_cache=True, display_results=True):
+    import statistics
+
+    datasets = datasets or format_benchmark_datasets
+    disk_cache = spark.conf.get("spark.databricks.io.cache.enabled", None)
+    if disable_disk_cache: spark.conf.set("spark.databricks.io.cache.enabled", "false")
+    results = []
+
+    try:
+        for group, names in datasets.items():
+            for name in names:
+                read, format, total_files = self._format_benchmark_reader(name)
+
+                for query, build in format_benchmark_queries[group].items():
+                    print(f"Benchmarking {query} on {name}", end="...")
+                    measured = [self._run_scan_benchmark(build(read())) for _ in range(runs)]
+                    median_run = sorted(measured, key=lambda m: m["seconds"])[len(measured) // 2]
+
+                    files_read = median_run.get("files_read")
+                    result = {"dataset": group, "copy": name, "format": format, "query": query,
+                              "median_seconds": statistics.median(m["seconds"] for m in measured),
+                              "executor_run_time_ms": median_run["executor_run_time_ms"],
+                              "bytes_read": median_run["bytes_read"],
+                              "files_read": files_read,
+                              "total_files": total_files,
+                              "files_pruned_pct": round(100 * (1 - files_read / total_files), 1) if files_read is not None and total_files else None,
+                              "rows_scanned": median_run.get("rows_scanned")}
+                    results.append(result)
+                    print(f"({result['median_seconds']} seconds)")
+    finally:
+        if disk_cache is None: spark.conf.unset("spark.databricks.io.cache.enabled")
+        else: spark.conf.set("spark.databricks.io.cache.enabled", disk_cache)
+
+    if display_results:
+        schema = "dataset STRING, copy STRING, format STRING, query STRING, median_seconds DOUBLE, executor_run_time_ms LONG, bytes_read LONG, files_read LONG, total_files LONG, files_pruned_pct DOUBLE, rows_scanned LONG"
+        display(spark.createDataFrame([tuple(r.values()) for r in results], schema))
+
+    return results
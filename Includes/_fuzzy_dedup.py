@@ -0,0 +1,96 @@
+# Databricks notebook source
+# Approximate duplicate detection for people records with typos, transposed names and inconsistent formatting. Candidate
+# pairs come only from records that share a blocking key or land in the same MinHash LSH band of their name trigrams, so
+# the work grows with the number of candidates rather than with the square of the number of records. Candidates are then
+# scored on name, SSN and birth date similarity.
+# Opt-in: not loaded by _common; use %run ../Includes/_fuzzy_dedup after the classroom setup.
+
+# Blocking keys as SQL expressions; records that share a non-empty value become candidates. Soundex codes of the first and
+# last name are ordered so that transposed names still share the key.
+fuzzy_blocking_keys = {
+    "ssn": "regexp_replace(ssn, '[^0-9]', '')",
+    "birth_date_last_name": "concat_ws('|', CAST(birthDate AS STRING), soundex(lastName))",
+    "name_soundex": "concat_ws('|', least(soundex(firstName), soundex(lastName)), greatest(soundex(firstName), soundex(lastName)))",
+}
+
+fuzzy_name_columns = ["firstName", "middleName", "lastName"]
+
+fuzzy_score_weights = {"name_similarity": 0.5, "ssn_similarity": 0.3, "birth_date_match": 0.2}
+
+# COMMAND ----------
+
+def __name_trigrams(name_columns):
+    # The trigrams of every name part, in one set, so that the order of the names does not matter
+    names = ", ".join(f"lower(coalesce(`{c}`, ''))" for c in name_columns)
+    return f"""array_distinct(flatten(transform(filter(array({names}), n -> n != ''),
+                 n -> transform(sequence(1, greatest(length(n) - 2, 1)), i -> substring(n, i, 3)))))"""
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def find_fuzzy_duplicates(self, df, min_score=0.8, blocking_keys=None, name_columns=None, min_name_similarity=0.5, num_bands=10, rows_per_band=2, max_block_size=1000):
+    import uuid
+    from pyspark.sql import functions as F
+    from pyspark.ml.feature import HashingTF, MinHashLSH
+    from pyspark.ml.functions import vector_to_array
+
+    blocking_keys = blocking_keys if blocking_keys is not None else fuzzy_blocking_keys
+    name_columns = name_columns or fuzzy_name_columns
+
+    # Ids from monotonically_increasing_id() are only stable if the input is not recomputed, so the numbered records are cached
+    records = df.select(F.struct("*").alias("record"), "*").withColumn("_fuzzy_id", F.monotonically_increasing_id())
+    # Named per call; a fixed name would unpersist the records of an earlier result that is still in use
+    records = records.withColumn("_trigrams", F.expr(__name_trigrams(name_columns)))
+    records = self.cache(records, name=f"fuzzy_duplicates_records_{uuid.uuid4().hex[:8]}")
+
+    def block_pairs(keyed, block_name):
+        # A key shared by too many records (a placeholder SSN, a common name) carries no signal and would be quadratic
+        usable = keyed.groupBy("_block").count().where(F.col("count") <= max_block_size).select("_block")
+        keyed = keyed.join(usable, "_block", "left_semi")
+
+        return (keyed.alias("a").join(keyed.alias("b"), "_block")
+                     .where("a._fuzzy_id < b._fuzzy_id")
+                     .select(F.col("a._fuzzy_id").alias("id_a"), F.col("b._fuzzy_id").alias("id_b"), F.lit(block_name).alias("matched_by")))
+
+    candidates = []
+    for block_name, expression in blocking_keys.items():
+        keyed = records.select("_fuzzy_id", F.expr(expression).alias("_block")).where("_block IS NOT NULL AND _block != ''")
+        candidates.append(block_pairs(keyed, block_name))
+
+    # LSH finds similar names that share no blocking key, e.g. a typo in the last name together with a mistyped SSN. Rather
+    # than approxSimilarityJoin, whose buckets are unbounded, every band of rows_per_band MinHash values becomes a blocking
+    # key, so a common name gets the same max_block_size cap as any other key.
+    hashed = HashingTF(inputCol="_trigrams", outputCol="_features", binary=True, numFeatures=1 << 18).transform(records.where("size(_trigrams) > 0"))
+    model = MinHashLSH(inputCol="_features", outputCol="_hashes", numHashTables=num_bands * rows_per_band, seed=42).fit(hashed)
+    banded = (model.transform(hashed)
+                   .select("_fuzzy_id", F.posexplode("_hashes").alias("_pos", "_hash"))
+                   .withColumn("_hash", vector_to_array("_hash")[0])
+                   .groupBy("_fuzzy_id", (F.col("_pos") / rows_per_band).cast("int").alias("_band"))
+                   .agg(F.sort_array(F.collect_list(F.struct("_pos", "_hash"))).alias("_values"))
+                   .select("_fuzzy_id", F.concat_ws("|", "_band", F.concat_ws(",", "_values._hash")).alias("_block")))
+
+    trigrams = lambda s: records.select(F.col("_fuzzy_id").alias(f"id_{s}"), F.col("_trigrams").alias(f"_trigrams_{s}"))
+    candidates.append(block_pairs(banded, "name_lsh").distinct()
+                                .join(trigrams("a"), "id_a").join(trigrams("b"), "id_b")
+                                .where(F.expr("size(array_intersect(_trigrams_a, _trigrams_b)) / greatest(size(array_union(_trigrams_a, _trigrams_b)), 1)") >= min_name_similarity)
+                                .select("id_a", "id_b", "matched_by"))
+
+    pairs = candidates[0]
+    for c in candidates[1:]:
+        pairs = pairs.unionByName(c)
+    pairs = pairs.groupBy("id_a", "id_b").agg(F.sort_array(F.collect_set("matched_by")).alias("matched_by"))
+
+    side = lambda s: records.select(*[F.col(c).alias(f"{c}_{s}") for c in ["_fuzzy_id", "record", "_trigrams", "ssn", "birthDate"]])
+    scored = (pairs.join(side("a"), F.col("id_a") == F.col("_fuzzy_id_a"))
+                   .join(side("b"), F.col("id_b") == F.col("_fuzzy_id_b"))
+                   .withColumn("name_similarity", F.expr("size(array_intersect(_trigrams_a, _trigrams_b)) / greatest(size(array_union(_trigrams_a, _trigrams_b)), 1)"))
+                   .withColumn("ssn_digits_a", F.regexp_replace("ssn_a", "[^0-9]", ""))
+                   .withColumn("ssn_digits_b", F.regexp_replace("ssn_b", "[^0-9]", ""))
+                   .withColumn("ssn_similarity", F.expr("coalesce(1 - levenshtein(ssn_digits_a, ssn_digits_b) / greatest(length(ssn_digits_a), length(ssn_digits_b), 1), 0)"))
+                   .withColumn("birth_date_match", F.expr("CAST(coalesce(birthDate_a = birthDate_b, false) AS DOUBLE)")))
+
+    score = sum((F.col(c) * w for c, w in fuzzy_score_weights.items()), F.lit(0.0))
+    return (scored.withColumn("score", F.round(score, 4))
+                  .where(F.col("score") >= min_score)
+                  .select("id_a", "id_b", "score", "name_similarity", "ssn_similarity", "birth_date_match", "matched_by",
+                          F.col("record_a").alias("a"), F.col("record_b").alias("b")))
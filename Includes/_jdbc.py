@@ -0,0 +1,125 @@
+# Databricks notebook source
+# A local stand-in for the remote training.people_1m Postgres table used in ASP 4.1, and a JDBC reader that chooses its own
+# partitioning. The stand-in is an embedded Derby database (Derby ships with Spark) on the driver's local disk, so it is only
+# reachable from executors running in the driver's JVM: local mode or a single-node cluster.
+# Opt-in: not loaded by _common; use %run ../Includes/_jdbc after the classroom setup.
+
+# COMMAND ----------
+
+# MAGIC %run ./_data_generator
+
+# COMMAND ----------
+
+jdbc_derby_driver = "org.apache.derby.jdbc.EmbeddedDriver"
+
+# Derby maps strings to CLOB by default, and CLOBs cannot be compared in a WHERE clause, which would defeat pushdown
+jdbc_people_column_types = "firstName VARCHAR(64), middleName VARCHAR(64), lastName VARCHAR(64), gender VARCHAR(1), ssn VARCHAR(11)"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def create_local_people_db(self, rows=1000000, id_skew=0.0, path=None):
+    import time
+    from pyspark.sql.functions import col, floor, lit, monotonically_increasing_id, pow
+
+    start = time.time()
+    path = path or f"/tmp/dbacademy-jdbc/{self.schema_name}"
+    jdbc_url = f"jdbc:derby:{path};create=true"
+    properties = {"driver": jdbc_derby_driver}
+    
+    print(f"Loading {rows:,} people into the local JDBC stand-in", end="...")
+
+    # Ids are strictly increasing; with id_skew > 0 they are packed densely at the low end and spread out at the high end,
+    # like the skewed id ranges that leave most stride-partitioned connections idle.
+    spread = rows * 10 if id_skew > 0 else 0
+    people_df = (self.generate_dataset("people", scale_factor=rows / generator_base_counts["people"])
+                 .limit(rows)
+                 .coalesce(1)
+                 .withColumn("position", monotonically_increasing_id())
+                 .withColumn("id", (lit(1) + col("position") + floor(pow(col("position") / rows, 1.0 + id_skew) * spread)).cast("long"))
+                 .select("id", "firstName", "middleName", "lastName", "gender", "birthDate", "ssn", "salary"))
+
+    (people_df.write
+              .mode("overwrite")
+              .option("createTableColumnTypes", jdbc_people_column_types)
+              .jdbc(jdbc_url, "training.people_1m", properties=properties))
+
+    print(f"({int(time.time()-start)} seconds)")
+    return {"url": jdbc_url, "table": "training.people_1m", "properties": properties}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _jdbc_query(self, url, query, properties):
+    return spark.read.format("jdbc").options(url=url, query=query, **properties).load().collect()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def plan_jdbc_partitions(self, url, table, column, properties=None, num_partitions=8, buckets=200, max_imbalance=1.25):
+    properties = properties or {}
+    
+    # Spark's JDBC writer creates quoted (case-sensitive) columns, which an unquoted name would not match on e.g. Derby
+    quoted = spark._jvm.org.apache.spark.sql.jdbc.JdbcDialects.get(url).quoteIdentifier(column)
+
+    bounds = self._jdbc_query(url, f"SELECT MIN({quoted}) AS lo, MAX({quoted}) AS hi, COUNT(*) AS n FROM {table}", properties)[0]
+    if bounds[0] is None:
+        # An empty table (or only NULLs): there is nothing to partition, so it is read as a single partition
+        return {"column": column, "lower_bound": None, "upper_bound": None, "row_count": int(bounds[2]), "num_partitions": 1,
+                "stride_imbalance": 1.0, "histogram": [], "strategy": "single", "predicates": None}
+
+    lo, hi, total = int(bounds[0]), int(bounds[1]), int(bounds[2])
+    width = hi - lo + 1
+
+    # An equi-width histogram computed by the database; only `buckets` rows come back
+    histogram = [0] * buckets
+    query = f"SELECT (({quoted} - {lo}) * {buckets}) / {width} AS bucket, COUNT(*) AS n FROM {table} GROUP BY (({quoted} - {lo}) * {buckets}) / {width}"
+    for bucket, count in self._jdbc_query(url, query, properties):
+        histogram[min(int(bucket), buckets-1)] += int(count)
+
+    bucket_start = lambda b: lo + (b * width) // buckets
+    
+    # Rows per partition if Spark's own stride is used (Spark divides [lo, hi] into equal-width ranges)
+    stride_rows = [0] * num_partitions
+    for b, count in enumerate(histogram):
+        stride_rows[min(num_partitions-1, (b * num_partitions) // buckets)] += count
+    imbalance = max(stride_rows) / max(1, total / num_partitions)
+
+    plan = {"column": column, "lower_bound": lo, "upper_bound": hi, "row_count": total, "num_partitions": num_partitions,
+            "stride_imbalance": round(imbalance, 3), "histogram": histogram}
+
+    if imbalance <= max_imbalance:
+        return {**plan, "strategy": "stride", "predicates": None, "expected_rows": stride_rows}
+
+    # Equi-depth boundaries from the cumulative histogram, expressed as explicit predicates
+    boundaries, cumulative, target = [], 0, total / num_partitions
+    for b, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= target * (len(boundaries) + 1) and len(boundaries) < num_partitions - 1:
+            boundaries.append(bucket_start(b + 1))
+    
+    edges = [None] + boundaries + [None]
+    predicates = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        conditions = ([f"{quoted} >= {low}"] if low is not None else []) + ([f"{quoted} < {high}"] if high is not None else [])
+        predicates.append(" AND ".join(conditions) or "1 = 1")
+    
+    return {**plan, "strategy": "predicates", "predicates": predicates}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def read_jdbc_partitioned(self, url, table, column, properties=None, num_partitions=8, verbose=True):
+    properties = properties or {}
+    plan = self.plan_jdbc_partitions(url, table, column, properties, num_partitions)
+
+    if verbose:
+        print(f"Reading {table} with {plan['strategy']} partitioning on {column} ({plan['row_count']:,} rows, stride imbalance {plan['stride_imbalance']}x)")
+
+    if plan["strategy"] == "single":
+        return spark.read.jdbc(url=url, table=table, properties=properties)
+    elif plan["strategy"] == "stride":
+        return spark.read.jdbc(url=url, table=table, column=column, lowerBound=plan["lower_bound"], upperBound=plan["upper_bound"],
+                               numPartitions=num_partitions, properties=properties)
+    else:
+        return spark.read.jdbc(url=url, table=table, predicates=plan["predicates"], properties=properties)
@@ -0,0 +1,79 @@
+# Databricks notebook source
+# Reports how rows and bytes are spread across the partitions of a DataFrame. Row sizes are estimated from the schema
+# (fixed widths for primitives, actual lengths for strings and binaries) and aggregated per spark_partition_id() in a
+# single job, so the DataFrame is never collected to the driver.
+
+partition_stats_widths = {"long": 8, "double": 8, "timestamp": 8, "integer": 4, "float": 4, "date": 4, "short": 2, "byte": 1, "boolean": 1, "decimal": 16}
+
+# COMMAND ----------
+
+def __estimated_row_size(schema):
+    from pyspark.sql import functions as F
+    from pyspark.sql.types import StringType, BinaryType, AtomicType
+
+    sizes = []
+    for field in schema.fields:
+        column = F.col(f"`{field.name}`")
+        if isinstance(field.dataType, (StringType, BinaryType)):
+            sizes.append(F.coalesce(F.octet_length(column), F.lit(0)))
+        elif isinstance(field.dataType, AtomicType):
+            sizes.append(F.lit(partition_stats_widths.get(field.dataType.typeName(), 8)))
+        else:
+            sizes.append(F.coalesce(F.octet_length(F.to_json(column)), F.lit(0)))  # Nested types are sized by their JSON form
+
+    return sum(sizes[1:], sizes[0]) if sizes else F.lit(0)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def get_partition_stats(self, df, straggler_factor=2.0, buckets=10):
+    import statistics
+    from pyspark.sql import functions as F
+
+    num_partitions = df.rdd.getNumPartitions()
+    counted = {r["partition"]: (r["rows"], r["bytes"]) for r in (df
+        .select(F.spark_partition_id().alias("partition"), __estimated_row_size(df.schema).alias("size"))
+        .groupBy("partition")
+        .agg(F.count("*").alias("rows"), F.sum("size").alias("bytes"))
+        .collect())}
+
+    # Empty partitions produce no rows in the aggregate, but they matter just as much for balance
+    partitions = [{"partition": p, "rows": counted.get(p, (0, 0))[0], "bytes": counted.get(p, (0, 0))[1] or 0} for p in range(num_partitions)]
+
+    rows = [p["rows"] for p in partitions]
+    median_rows = statistics.median(rows) if rows else 0
+    max_rows = max(rows) if rows else 0
+    skew_ratio = max_rows / median_rows if median_rows else (float("inf") if max_rows else 1.0)
+
+    width = max(1, -(-max_rows // buckets))
+    histogram = [{"min_rows": i * width, "max_rows": (i + 1) * width - 1, "partitions": 0} for i in range(buckets)]
+    for r in rows:
+        histogram[min(buckets - 1, r // width)]["partitions"] += 1
+
+    return {
+        "num_partitions": num_partitions,
+        "total_rows": sum(rows),
+        "total_bytes": sum(p["bytes"] for p in partitions),
+        "median_rows": median_rows,
+        "max_rows": max_rows,
+        "skew_ratio": skew_ratio,
+        "empty_partitions": sum(1 for r in rows if r == 0),
+        "stragglers": [p for p in partitions if median_rows and p["rows"] > straggler_factor * median_rows],
+        "histogram": histogram,
+        "partitions": partitions,
+    }
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def display_partition_stats(self, df, straggler_factor=2.0, buckets=10):
+    stats = self.get_partition_stats(df, straggler_factor, buckets)
+
+    print(f"{stats['num_partitions']} partitions, {stats['total_rows']:,} rows, ~{stats['total_bytes']:,} bytes")
+    print(f"| skew ratio (max/median rows): {stats['skew_ratio']:.2f}, empty partitions: {stats['empty_partitions']}, stragglers: {len(stats['stragglers'])}")
+
+    straggling = {p["partition"] for p in stats["stragglers"]}
+    rows = [(p["partition"], p["rows"], p["bytes"], p["partition"] in straggling) for p in stats["partitions"]]
+    display(spark.createDataFrame(rows, "partition INT, rows LONG, bytes LONG, straggler BOOLEAN"))
+
+    return stats
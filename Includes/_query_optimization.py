@@ -0,0 +1,79 @@
+# Databricks notebook source
+# Helpers for the query optimization lesson (ASP 4.1) and for diagnosing the same problems at production scale.
+# Opt-in: not loaded by _common; use %run ../Includes/_query_optimization after the classroom setup.
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def exclusion_filter(self, column, values, keep_nulls=False):
+    from pyspark.sql.functions import col, lit
+
+    # Chains of col != v silently drop NULLs (NULL != v is NULL), and a NULL inside NOT IN (...) would drop every row, so
+    # NULLs are removed from the list and handled explicitly. Above spark.sql.optimizer.inSetConversionThreshold values
+    # Catalyst turns the NOT IN into a hash-set (InSet) lookup instead of one comparison per value.
+    column = col(column) if isinstance(column, str) else column
+    values = list(dict.fromkeys(v for v in values if v is not None))
+    
+    if not values:
+        return lit(True) if keep_nulls else column.isNotNull()
+    
+    predicate = ~column.isin(values)
+    return column.isNull() | predicate if keep_nulls else column.isNotNull() & predicate
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _time_query_phases(self, build):
+    import time
+
+    # A Dataset is analyzed as soon as it is built, so analysis is timed by building it (for a filter chain, once per link)
+    start = time.perf_counter()
+    df = build()
+    timings = {"analysis_seconds": round(time.perf_counter()-start, 4)}
+
+    # The remaining phases are forced in turn; QueryExecution caches them, so the timings do not overlap
+    qe = df._jdf.queryExecution()
+    for phase, force in [("optimization", qe.optimizedPlan), ("planning", qe.executedPlan)]:
+        start = time.perf_counter()
+        force()
+        timings[f"{phase}_seconds"] = round(time.perf_counter()-start, 4)
+
+    start = time.perf_counter()
+    df.write.format("noop").mode("overwrite").save()
+    timings["execution_seconds"] = round(time.perf_counter()-start, 4)
+    return timings
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def benchmark_exclusion_filters(self, df, column, sizes=(8, 64, 512, 2048, 10000), display_results=True):
+    from functools import reduce
+    from pyspark.sql.functions import col
+
+    # Real values first, so that the filters actually remove rows, padded with values that never match
+    existing = [r[0] for r in df.select(column).where(col(column).isNotNull()).distinct().limit(max(sizes)).collect()]
+    results = []
+
+    for size in sizes:
+        values = (existing + [f"excluded_value_{i}" for i in range(size)])[:size]
+        variants = {
+            "filter_chain": lambda: reduce(lambda d, v: d.filter(col(column) != v), values, df),
+            "not_in": lambda: df.filter(self.exclusion_filter(column, values)),
+        }
+
+        for variant, build in variants.items():
+            print(f"Benchmarking {variant} with {size} excluded values", end="...")
+            try:
+                result = {"variant": variant, "excluded_values": size, **self._time_query_phases(build), "error": None}
+            except Exception as e:
+                # Very long chains can overflow the analyzer's stack; that is a result too
+                result = {"variant": variant, "excluded_values": size, "error": str(e).split("\n")[0][:200]}
+            results.append(result)
+            print(f"({result.get('optimization_seconds')} / {result.get('execution_seconds')} seconds)")
+
+    if display_results:
+        schema = "variant STRING, excluded_values INT, analysis_seconds DOUBLE, optimization_seconds DOUBLE, planning_seconds DOUBLE, execution_seconds DOUBLE, error STRING"
+        rows = [(r["variant"], r["excluded_values"], r.get("analysis_seconds"), r.get("optimization_seconds"), r.get("planning_seconds"), r.get("execution_seconds"), r["error"]) for r in results]
+        display(spark.createDataFrame(rows, schema))
+
+    return results
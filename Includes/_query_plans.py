@@ -0,0 +1,140 @@
+# Databricks notebook source
+# Captures a DataFrame's parsed, analyzed, optimized and physical plans as nested dicts so that the observations made by
+# reading explain(True) in ASP 4.1 can be asserted programmatically, and checked again whenever the runtime changes.
+# Opt-in: not loaded by _common; use %run ../Includes/_query_plans after the classroom setup.
+
+# COMMAND ----------
+
+def __plan_to_tree(node):
+    import re
+
+    def seq(scala_seq):
+        return [scala_seq.apply(i) for i in range(scala_seq.size())]
+
+    name = node.nodeName()
+    if name == "AdaptiveSparkPlan":
+        return __plan_to_tree(node.executedPlan())  # The current (possibly re-optimized) plan, not the AQE wrapper
+
+    description = node.simpleString(1000)
+    pushed = re.search(r"PushedFilters: \[(.*?)\]", description)
+
+    return {"name": name,
+            "description": description,
+            "pushed_filters": [f.strip() for f in re.split(r",\s*(?![^()]*\))", pushed.group(1)) if f.strip()] if pushed else [],
+            "children": [__plan_to_tree(c) for c in seq(node.children())],
+            "inner_children": [__plan_to_tree(c) for c in seq(node.innerChildren())]}
+
+class QueryPlans:
+
+    def __init__(self, parsed, analyzed, optimized, physical):
+        self.parsed = parsed
+        self.analyzed = analyzed
+        self.optimized = optimized
+        self.physical = physical
+
+    def to_dict(self):
+        return {"parsed": self.parsed, "analyzed": self.analyzed, "optimized": self.optimized, "physical": self.physical}
+
+    @staticmethod
+    def nodes(tree, include_inner=True):
+        yield tree
+        for child in tree["children"] + (tree["inner_children"] if include_inner else []):
+            yield from QueryPlans.nodes(child, include_inner)
+
+    def find(self, name, plan="physical", include_inner=True):
+        return [n for n in QueryPlans.nodes(getattr(self, plan), include_inner) if name in n["name"]]
+
+    def scans(self):
+        return [n for n in QueryPlans.nodes(self.physical, include_inner=False) if "Scan" in n["name"]]
+
+    def pushed_filters(self):
+        return [f for scan in self.scans() for f in scan["pushed_filters"]]
+
+    # Assertions, each returning self so that they can be chained
+
+    def assert_present(self, name, plan="physical"):
+        assert self.find(name, plan), f"Expected a {name} node in the {plan} plan"
+        return self
+
+    def assert_absent(self, name, plan="physical"):
+        assert not self.find(name, plan), f"Expected no {name} node in the {plan} plan"
+        return self
+
+    def assert_filter_pushed_into_scan(self):
+        assert self.pushed_filters(), f"Expected the scan to have PushedFilters, found none in {[s['name'] for s in self.scans()]}"
+        return self
+
+    def assert_pushed_filters_contain(self, column):
+        assert any(column in f for f in self.pushed_filters()), f"Expected PushedFilters to reference \"{column}\", found {self.pushed_filters()}"
+        return self
+
+    def assert_no_exchange(self):
+        return self.assert_absent("Exchange")
+
+    def assert_filter_count(self, expected, plan="optimized"):
+        actual = len(self.find("Filter", plan, include_inner=False))
+        assert actual == expected, f"Expected {expected} Filter node(s) in the {plan} plan, found {actual}"
+        return self
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def capture_plans(self, df):
+    qe = df._jdf.queryExecution()
+    return QueryPlans(parsed=__plan_to_tree(qe.logical()),
+                      analyzed=__plan_to_tree(qe.analyzed()),
+                      optimized=__plan_to_tree(qe.optimizedPlan()),
+                      physical=__plan_to_tree(qe.executedPlan()))
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def validate_query_plans(self, jdbc_url=None, jdbc_table="training.people_1m", jdbc_properties=None):
+    from functools import reduce
+    from pyspark.sql.functions import col
+
+    suite = self.tests.new("4.1-plans")
+    df = spark.read.format("delta").load(f"{self.paths.datasets}/ecommerce/events/events.delta")
+    
+    def check(plans_function, assertion):
+        def test():
+            try:
+                assertion(plans_function())
+                return True
+            except AssertionError as e:
+                print(f"Plan regression: {e}")
+                return False
+        return test
+
+    excluded = ["reviews", "checkout", "register", "email_coupon", "cc_info", "delivery", "shipping_info", "press"]
+    limit_events = lambda: self.capture_plans(reduce(lambda d, v: d.filter(col("event_name") != v), excluded, df))
+    
+    suite.test(actual_value=lambda: None, test_function=check(limit_events, lambda p: p.assert_filter_count(1)),
+               description="Chained filters are combined into a single Filter")
+    suite.test(actual_value=lambda: None, test_function=check(limit_events, lambda p: p.assert_pushed_filters_contain("event_name")),
+               description="Event name filters are pushed into the Delta scan")
+
+    duplicate_filters = lambda: self.capture_plans(reduce(lambda d, _: d.filter(col("event_name") != "finalize"), range(5), df))
+    suite.test(actual_value=lambda: None, test_function=check(duplicate_filters, lambda p: p.assert_filter_count(1)),
+               description="Duplicate filter conditions are collapsed")
+
+    projection = lambda: self.capture_plans(df.select("user_id", "event_name").filter(col("event_name") == "finalize"))
+    suite.test(actual_value=lambda: None, test_function=check(projection, lambda p: p.assert_no_exchange()),
+               description="A narrow filter and projection plans without an Exchange")
+
+    if jdbc_url is not None:
+        jdbc_df = lambda: spark.read.jdbc(url=jdbc_url, table=jdbc_table, properties=jdbc_properties or {})
+        suite.test(actual_value=lambda: None, 
+                   test_function=check(lambda: self.capture_plans(jdbc_df().filter(col("gender") == "M")), 
+                                       lambda p: p.assert_filter_pushed_into_scan().assert_pushed_filters_contain("gender")),
+                   description="The gender filter is pushed into the JDBC scan")
+
+        def cached_plans():
+            cached_df = jdbc_df().cache()
+            try: return self.capture_plans(cached_df.filter(col("gender") == "M"))
+            finally: cached_df.unpersist()
+        suite.test(actual_value=lambda: None, test_function=check(cached_plans, lambda p: p.assert_present("InMemoryTableScan")),
+                   description="Filtering a cached DataFrame scans the InMemoryRelation")
+
+    suite.display_results()
+    return suite.passed
@@ -0,0 +1,70 @@
+# Databricks notebook source
+# Batched validation suites. A BatchedTestSuite wraps a regular test suite and defers every test_* call until
+# display_results(). At that point each actual_value lambda is evaluated at most once, and schema expectations registered
+# through test_schema() are checked as one structural diff rather than one test per field.
+
+class BatchedTestSuite:
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.tests = []
+
+    def __getattr__(self, name):
+        attr = getattr(self.suite, name)
+        if not name.startswith("test"):
+            return attr
+
+        def deferred(*args, **kwargs):
+            self.tests.append((name, args, kwargs))
+        return deferred
+
+    @property
+    def passed(self):
+        return self.suite.passed
+
+    def test_schema(self, actual_schema, expected_fields, description=None, hint=None):
+        # expected_fields maps each field name to its type name (e.g. "LongType"), or to a (type name, nullable) tuple
+        def diff():
+            schema = actual_schema()
+            actual = {f.name: f for f in schema.fields}
+            differences = {}
+            for name, expected in expected_fields.items():
+                expected_type, expected_nullable = expected if isinstance(expected, tuple) else (expected, None)
+                if name not in actual:
+                    differences[name] = "missing"
+                elif type(actual[name].dataType).__name__ != expected_type:
+                    differences[name] = f"expected {expected_type}, found {type(actual[name].dataType).__name__}"
+                elif expected_nullable is not None and actual[name].nullable != expected_nullable:
+                    differences[name] = f"expected nullable={expected_nullable}"
+            return differences
+
+        self.tests.append(("test_equals", (), {"actual_value": diff,
+                                               "expected_value": {},
+                                               "description": description or f"Schema contains the fields {', '.join(expected_fields.keys())}",
+                                               "hint": hint or "Differences: [[ACTUAL_VALUE]]"}))
+
+    def _memoize(self, function):
+        cache = []
+        def memoized():
+            if not cache: cache.append(function())
+            return cache[0]
+        return memoized
+
+    def execute(self):
+        for name, args, kwargs in self.tests:
+            if args and callable(args[0]):
+                args = (self._memoize(args[0]),) + tuple(args[1:])
+            if callable(kwargs.get("actual_value")):
+                kwargs = {**kwargs, "actual_value": self._memoize(kwargs["actual_value"])}
+            getattr(self.suite, name)(*args, **kwargs)
+        self.tests = []
+
+    def display_results(self):
+        self.execute()
+        return self.suite.display_results()
+
+# COMMAND ----------
+
+@ValidationHelper.monkey_patch
+def new_batched(self, name):
+    return BatchedTestSuite(self.new(name))
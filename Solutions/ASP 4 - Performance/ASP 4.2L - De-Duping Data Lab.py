@@ -81,6 +81,23 @@ df = (spark
 
 # COMMAND ----------
 
+# MAGIC %md **Aside:** Rather than picking the number by hand, **`DA.recommend_shuffle_partitions`** estimates the shuffle volume from the input's size and divides it by a target partition size, rounded up to whole waves of cores. **`DA.configure_shuffle_partitions`** applies the same recommendation.
+
+# COMMAND ----------
+
+print(DA.recommend_shuffle_partitions(df)["partitions"])
+
+# COMMAND ----------
+
+# MAGIC %md **Optional:** **`inferSchema`** costs an extra pass over the file every time it is read. **`DA.read_with_schema`** infers the schema once, keeps its DDL in a schema registry, and hands it to later reads, re-checking only a sample of the files when they change.
+
+# COMMAND ----------
+
+registry_df = DA.read_with_schema(source_file, "csv", header="true", sep=":")
+print(registry_df.schema.simpleString())
+
+# COMMAND ----------
+
 # ANSWER
 from pyspark.sql.functions import col, lower, translate
 
@@ -99,6 +116,16 @@ deduped_df = (df
 
 # COMMAND ----------
 
+# MAGIC %md **Optional:** On larger data, shuffling seven wide string columns gets expensive. **`DA.dedup`** applies the same normalization, but de-duplicates on a compact hash of the normalized key and only compares the actual values where two different keys share a hash.
+
+# COMMAND ----------
+
+hashed_deduped_df = DA.dedup(df, {"firstName": "lower", "middleName": "lower", "lastName": "lower", "ssn": "digits",
+                                  "gender": "exact", "birthDate": "exact", "salary": "exact"})
+print(f"{hashed_deduped_df.count():,} records")
+
+# COMMAND ----------
+
 # ANSWER
 
 # Now, write the results in Delta format as a single file. We'll also display the Delta files to make sure they were written as expected.
@@ -115,26 +142,21 @@ display(dbutils.fs.ls(delta_dest_dir))
 
 # COMMAND ----------
 
-# MAGIC %md **CHECK YOUR WORK**
+# MAGIC %md **Aside:** **`repartition(1)`** funnels the whole write through a single task, which becomes the bottleneck on large data. **`DA.write_delta`** instead writes in parallel and then compacts the output with **`OPTIMIZE`** into files of a target size (here, a single file). The compaction is recorded in the Delta log, so the table's current version refers only to the compacted files.
 
 # COMMAND ----------
 
-verify_files = dbutils.fs.ls(delta_dest_dir)
-verify_delta_format = False
-verify_num_data_files = 0
-for f in verify_files:
-    if f.name == "_delta_log/":
-        verify_delta_format = True
-    elif f.name.endswith(".parquet"):
-        verify_num_data_files += 1
+layout = DA.write_delta(deduped_df, f"{DA.paths.working_dir}/people_compacted", max_files=1)
+print(f"Wrote {layout['files_written']} file(s), compacted to {layout['num_files']} ({layout['size_in_bytes']:,} bytes, {layout['num_records']:,} records)")
 
-assert verify_delta_format, "Data not written in Delta format"
-assert verify_num_data_files == 1, "Expected 1 data file written"
+# COMMAND ----------
 
-verify_record_count = spark.read.format("delta").load(delta_dest_dir).count()
-assert verify_record_count == 100000, "Expected 100000 records in final result"
+# MAGIC %md **CHECK YOUR WORK**
+
+# COMMAND ----------
 
-del verify_files, verify_delta_format, verify_num_data_files, verify_record_count
+# Files and records are counted from the Delta transaction log, so no data needs to be scanned
+DA.verify_delta_output(delta_dest_dir, expected_files=1, expected_records=100000)
 print("All test pass")
 
 # COMMAND ----------
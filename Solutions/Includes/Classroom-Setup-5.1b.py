@@ -5,24 +5,26 @@
 
 @ValidationHelper.monkey_patch
 def validate_1_1(self, schema):
-    suite = DA.tests.new("5.1b-1.1")
+    suite = DA.tests.new_batched("5.1b-1.1")
 
     suite.test_equals(lambda: type(schema), expected_value=StructType, description="Schema is of type StructType", hint="Found [[ACTUAL_VALUE]]")
     
     suite.test_length(lambda: schema.fieldNames(), 12, description="Schema contians 12 field", hint="Found [[LEN_ACTUAL_VALUE]]: [[ACTUAL_VALUE]]")
     
-    suite.test_schema_field(lambda: schema, "device", "StringType", None)
-    suite.test_schema_field(lambda: schema, "ecommerce", "StructType", None)
-    suite.test_schema_field(lambda: schema, "event_name", "StringType", None)
-    suite.test_schema_field(lambda: schema, "event_previous_timestamp", "LongType", None)
-    suite.test_schema_field(lambda: schema, "event_timestamp", "LongType", None)
-    suite.test_schema_field(lambda: schema, "geo", "StructType", None)
-    suite.test_schema_field(lambda: schema, "items", "ArrayType", None)
-    suite.test_schema_field(lambda: schema, "traffic_source", "StringType", None)
-    suite.test_schema_field(lambda: schema, "user_first_touch_timestamp", "LongType", None)
-    suite.test_schema_field(lambda: schema, "user_id", "StringType", None)
-    suite.test_schema_field(lambda: schema, "hour", "IntegerType", None)
-    suite.test_schema_field(lambda: schema, "createdAt", "TimestampType", None)
+    suite.test_schema(lambda: schema, {
+        "device": "StringType",
+        "ecommerce": "StructType",
+        "event_name": "StringType",
+        "event_previous_timestamp": "LongType",
+        "event_timestamp": "LongType",
+        "geo": "StructType",
+        "items": "ArrayType",
+        "traffic_source": "StringType",
+        "user_first_touch_timestamp": "LongType",
+        "user_id": "StringType",
+        "hour": "IntegerType",
+        "createdAt": "TimestampType",
+    })
     
     suite.display_results()
     assert suite.passed, "One or more tests failed."
@@ -32,15 +34,13 @@ def validate_1_1(self, schema):
 
 @ValidationHelper.monkey_patch
 def validate_2_1(self, schema):
-    suite = DA.tests.new("5.1b-2.1")
+    suite = DA.tests.new_batched("5.1b-2.1")
 
     suite.test_equals(lambda: type(schema), expected_value=StructType, description="Schema is of type StructType", hint="Found [[ACTUAL_VALUE]]")
     
     suite.test_length(lambda: schema.fieldNames(), 3, description="Schema contians three field", hint="Found [[LEN_ACTUAL_VALUE]]: [[ACTUAL_VALUE]]")
     
-    suite.test_schema_field(lambda: schema, "traffic_source", "StringType", None)
-    suite.test_schema_field(lambda: schema, "active_users", "LongType", None)
-    suite.test_schema_field(lambda: schema, "hour", "IntegerType", None)
+    suite.test_schema(lambda: schema, {"traffic_source": "StringType", "active_users": "LongType", "hour": "IntegerType"})
     
     suite.display_results()
     assert suite.passed, "One or more tests failed."
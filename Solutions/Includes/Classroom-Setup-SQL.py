@@ -4,14 +4,58 @@
 # COMMAND ----------
 
 @DBAcademyHelper.monkey_patch
-def create_table(self, table_name, location):
+def clone_table(self, table_name, location, scheduler_pool=None):
     import time
-    start = int(time.time())
-    
+
+    # A snapshot reset already put the table back at its post-setup version
+    if self.is_restored_from_snapshot(table_name):
+        return {"table_name": table_name, "location": location, "scheduler_pool": scheduler_pool, "seconds": 0.0}
+
+    # Local properties are per-thread, so each clone can be scheduled in its own fair-scheduler pool
+    if scheduler_pool is not None:
+        spark.sparkContext.setLocalProperty("spark.scheduler.pool", scheduler_pool)
+
+    start = time.time()
+    try:
+        spark.sql(f"CREATE OR REPLACE TABLE {table_name} SHALLOW CLONE delta.`{self.paths.datasets}/{location}`")
+    finally:
+        if scheduler_pool is not None:
+            spark.sparkContext.setLocalProperty("spark.scheduler.pool", None)
+
+    return {"table_name": table_name, "location": location, "scheduler_pool": scheduler_pool, "seconds": round(time.time()-start, 3)}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def create_table(self, table_name, location):
     print(f"Creating the table \"{table_name}\"", end="...")
-    spark.sql(f"CREATE OR REPLACE TABLE {table_name} SHALLOW CLONE delta.`{DA.paths.datasets}/{location}`")
-        
-    print(f"({int(time.time())-start} seconds)")
+    result = self.clone_table(table_name, location)
+    print(f"({int(result['seconds'])} seconds)")
+    return result
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def create_tables(self, tables, max_workers=4):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    # tables maps table names to their dataset-relative locations; every clone is independent of the others
+    start = time.time()
+    max_workers = max(1, min(max_workers, len(tables)))
+
+    print(f"Creating {len(tables)} tables with {max_workers} concurrent clones", end="...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(self.clone_table, table_name, location, f"{self.course_config.course_code}_clone_{table_name}")
+                   for table_name, location in tables.items()]
+        results = [f.result() for f in futures]
+
+    total_seconds = round(time.time()-start, 3)
+    print(f"({int(total_seconds)} seconds)")
+    for result in results:
+        print(f"| {result['table_name']}: {result['seconds']} seconds")
+
+    return {"tables": results, "total_seconds": total_seconds}
 
 # COMMAND ----------
 
@@ -20,10 +64,11 @@ DA.reset_lesson()
 DA.init()
 DA.conclude_setup()
 
-DA.create_table("events", "ecommerce/events/events.delta", )
-DA.create_table("sales", "ecommerce/sales/sales.delta", )
-DA.create_table("users", "ecommerce/users/users.delta")
-DA.create_table("products", "products/products.delta", )
+DA.create_tables({
+    "events": "ecommerce/events/events.delta",
+    "sales": "ecommerce/sales/sales.delta",
+    "users": "ecommerce/users/users.delta",
+    "products": "products/products.delta",
+})
 
 DA.conclude_setup()
-
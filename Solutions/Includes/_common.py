@@ -11,7 +11,56 @@ def __validate_libraries():
         error = f"Unable to access GitHub or PyPi resources ({site})."
         raise AssertionError("{error} Please see the \"Troubleshooting | {section}\" section of the \"Version Info\" notebook for more information.".format(error=error, section="Cannot Install Libraries")) from e
 
+def __wheelhouse_dir():
+    # Wheels are stored by content hash under a FUSE-mounted directory so that they survive cluster restarts
+    return spark.conf.get("dbacademy.library.wheelhouse", "/dbfs/FileStore/dbacademy/wheelhouse")
+
+def __fingerprint_path(version):
+    return f"{__wheelhouse_dir()}/dbacademy-{version}.fingerprint.json"
+
+def __lookup_cached_wheel(version):
+    import json, hashlib
+    try:
+        with open(__fingerprint_path(version)) as f:
+            fingerprint = json.load(f)
+        
+        with open(fingerprint["wheel"], "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        # Entries cached before the dependencies were downloaded alongside the wheel cannot be installed offline
+        if fingerprint.get("version") == version and digest == fingerprint.get("sha256") and fingerprint.get("dependencies"):
+            return fingerprint["wheel"]
+    except Exception:
+        pass  # Missing, stale or corrupt cache entries are simply treated as a cache miss
+    return None
+
+def __cache_wheel(version, library_url):
+    import os, sys, json, hashlib, requests, subprocess
+
+    response = requests.get(library_url, timeout=30)
+    assert response.status_code == 200, f"HTTP {response.status_code} for {library_url}"
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    wheel_dir = f"{__wheelhouse_dir()}/sha256/{digest}"
+    wheel_path = f"{wheel_dir}/{library_url.split('/')[-1]}"
+
+    os.makedirs(wheel_dir, exist_ok=True)
+    with open(wheel_path, "wb") as f:
+        f.write(response.content)
+
+    # The dependencies go next to the wheel, so that the offline install below can resolve them without an index
+    download = subprocess.run([sys.executable, "-m", "pip", "download", "--quiet", "--disable-pip-version-check", "--dest", wheel_dir, wheel_path],
+                              capture_output=True, text=True)
+    assert download.returncode == 0, f"Unable to download the dependencies of {wheel_path}: {download.stderr.strip()}"
+
+    # The fingerprint is written last so that a partial download is never mistaken for a cached wheel
+    with open(__fingerprint_path(version), "w") as f:
+        json.dump({"version": version, "library_url": library_url, "sha256": digest, "wheel": wheel_path, "dependencies": True}, f)
+
+    return wheel_path
+
 def __install_libraries():
+    import os
     global pip_command
     
     specified_version = f"v3.0.23"
@@ -45,9 +94,25 @@ def __install_libraries():
 
         if pip_command != default_command:
             print(f"WARNING: Using alternative library installation:\n| default: %pip {default_command}\n| current: %pip {pip_command}")
-        else:
-            # We are using the default libraries; next we need to verify that we can reach those libraries.
+            return
+        
+        if not version.startswith("v"):
+            # Git references cannot be fingerprinted, so we need to verify that we can reach those libraries.
             __validate_libraries()
+            return
+
+        wheel_path = __lookup_cached_wheel(version)
+        if wheel_path is None:
+            try:
+                wheel_path = __cache_wheel(version, library_url)
+            except Exception:
+                # Either we are offline or the wheelhouse is not writable; the probe reports which, and otherwise we install directly.
+                __validate_libraries()
+                return
+
+        # Installing from the wheel's own directory, which also holds its dependencies, with --no-index skips both the network
+        # probe and pip's index resolution
+        pip_command = f"install --quiet --disable-pip-version-check --no-index --find-links {os.path.dirname(wheel_path)} {wheel_path}"
 
 __install_libraries()
 
@@ -87,3 +152,54 @@ lesson_config = LessonConfig(name = None,
                              enable_streaming_support = True,
                              enable_ml_support = False)
 
+# COMMAND ----------
+
+# MAGIC %run ./_dataset_installer
+
+# COMMAND ----------
+
+# MAGIC %run ./_dataset_manifest
+
+# COMMAND ----------
+
+# MAGIC %run ./_schema_registry
+
+# COMMAND ----------
+
+# MAGIC %run ./_streaming
+
+# COMMAND ----------
+
+# MAGIC %run ./_delta_log
+
+# COMMAND ----------
+
+# MAGIC %run ./_delta_writer
+
+# COMMAND ----------
+
+# MAGIC %run ./_validations
+
+# COMMAND ----------
+
+# MAGIC %run ./_cache_registry
+
+# COMMAND ----------
+
+# MAGIC %run ./_shuffle_sizing
+
+# COMMAND ----------
+
+# MAGIC %run ./_partition_stats
+
+# COMMAND ----------
+
+# MAGIC %run ./_dedup
+
+# COMMAND ----------
+
+# MAGIC %run ./_lesson_snapshots
+
+# COMMAND ----------
+
+# MAGIC %run ./_setup_profiler
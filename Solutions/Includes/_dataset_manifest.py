@@ -0,0 +1,201 @@
+# Databricks notebook source
+# A structured manifest of the course datasets, derived from remote_files. Each dataset records its format, data files & sizes,
+# record count, schema DDL and partition columns so that labs can look those up instead of launching Spark jobs. The manifest
+# is exposed as DA.paths.manifest by DA.init(), built the first time it is used and then persisted next to the datasets
+# directory, so the classroom setup itself never scans the datasets.
+
+# Bumped whenever the content of the manifest changes, so that manifests built by earlier versions are rebuilt
+dataset_manifest_version = 2
+
+dataset_formats = {".json": "json", ".csv": "csv", ".txt": "csv", ".parquet": "parquet", ".delta": "delta"}
+
+dataset_reader_options = {
+    "ecommerce/users/users-500k.csv": {"sep": "\t", "header": "true"},
+    "products/products.csv": {"header": "true"},
+    "people/people-with-dups.txt": {"sep": ":", "header": "true"},
+}
+
+# COMMAND ----------
+
+def __index_datasets(remote_files):
+    import re
+
+    datasets = {}
+    for path in sorted(remote_files, key=len):
+        name = path.strip("/")
+        extension = name[name.rfind("."):] if "." in name.split("/")[-1] else None
+
+        if extension in dataset_formats and not any(name.startswith(d + "/") for d in datasets):
+            # Single-file datasets such as people-with-dups.txt are their own (only) data file
+            datasets[name] = {"format": dataset_formats[extension], "partition_columns": [], "files": [] if path.endswith("/") else [""]}
+            continue
+        
+        parent = next((d for d in datasets if name.startswith(d + "/")), None)
+        if parent is None: continue
+        relative = name[len(parent)+1:]
+
+        for column in re.findall(r"(?:^|/)([^/=]+)=[^/]*", relative):
+            if column not in datasets[parent]["partition_columns"]:
+                datasets[parent]["partition_columns"].append(column)
+
+        # Commit markers, _SUCCESS files and the transaction log are not data
+        if not path.endswith("/") and not any(p.startswith(("_", ".")) for p in relative.split("/")):
+            datasets[parent]["files"].append(relative)
+    
+    return datasets
+
+dataset_index = __index_datasets(remote_files)
+
+# COMMAND ----------
+
+class DatasetManifest:
+    
+    def __init__(self, datasets):
+        self.datasets = datasets
+
+    def __repr__(self):
+        return f"DatasetManifest({len(self.datasets)} datasets)"
+
+    def resolve(self, name):
+        # Datasets can be referenced by their full relative path (ecommerce/events/events.delta) or by their name (events.delta)
+        name = name.strip("/")
+        if name in self.datasets: return name
+        matches = [k for k in self.datasets if k.split("/")[-1] == name]
+        if len(matches) != 1: raise KeyError(name)
+        return matches[0]
+
+    def __getitem__(self, name):
+        return self.datasets[self.resolve(name)]
+
+    def names(self):
+        return list(self.datasets.keys())
+
+    def count(self, name):
+        return self[name]["record_count"]
+
+    def size_in_bytes(self, name):
+        return self[name]["size_in_bytes"]
+
+    def file_count(self, name):
+        return len(self[name]["files"])
+
+    def schema(self, name):
+        return self[name]["schema_ddl"]
+
+    def partition_columns(self, name):
+        return self[name]["partition_columns"]
+
+
+class LazyDatasetManifest(DatasetManifest):
+
+    def __init__(self, build):
+        self._build = build
+        self._datasets = None
+
+    def __repr__(self):
+        return super().__repr__() if self._datasets is not None else "DatasetManifest(not built yet)"
+
+    @property
+    def datasets(self):
+        # Reading every dataset takes minutes, so it only happens once a lab actually looks something up
+        if self._datasets is None:
+            self._datasets = self._build().datasets
+        return self._datasets
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _dataset_manifest_path(self):
+    return f"{self.paths.datasets.rstrip('/')}.dataset-manifest.json"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def read_dataset(self, name, schema=None, infer_schema=False):
+    name = DatasetManifest(dataset_index).resolve(name)
+
+    reader = spark.read.format(dataset_index[name]["format"]).options(**dataset_reader_options.get(name, {}))
+    if schema is not None: reader = reader.schema(schema)
+    elif infer_schema and dataset_index[name]["format"] == "csv": reader = reader.option("inferSchema", "true")
+    return reader.load(f"{self.paths.datasets}/{name}")
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def build_dataset_manifest(self):
+    import json, time
+
+    start = time.time()
+    print(f"Building the dataset manifest", end="...")
+    
+    datasets = {}
+    for name, indexed in dataset_index.items():
+        path = f"{self.paths.datasets}/{name}"
+        entry = dict(indexed)
+
+        if entry["format"] == "delta":
+            # Only the files of the current version count; a listing would include files that were removed from the table
+            log = self.read_delta_log(path)
+            entry["partition_columns"] = log["metadata"].get("partition_columns", [])
+            entry["files"] = {p: f["size"] for p, f in log["files"].items()}
+            entry["size_in_bytes"] = sum(f["size"] or 0 for f in log["files"].values())
+        else:
+            sizes = {}
+            for relative in entry["files"]:
+                file_info = dbutils.fs.ls(f"{path}/{relative}" if relative else path)[0]
+                sizes[relative or name.split("/")[-1]] = file_info.size
+            entry["files"] = sizes
+            entry["size_in_bytes"] = sum(sizes.values())
+
+        # The manifest is built once, so CSV schemas are inferred here to record actual column types rather than all strings
+        df = self.read_dataset(name, infer_schema=True)
+        entry["schema_ddl"] = df._jdf.schema().toDDL()
+        entry["record_count"] = df.count()
+        datasets[name] = entry
+
+    manifest = {"data_source": f"{self.course_config.data_source_name}/{self.course_config.data_source_version}", "manifest_version": dataset_manifest_version, "datasets": datasets}
+    dbutils.fs.put(self._dataset_manifest_path(), json.dumps(manifest, indent=2), True)
+
+    print(f"({int(time.time()-start)} seconds)")
+    return DatasetManifest(datasets)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def load_dataset_manifest(self):
+    import json
+    try:
+        manifest = json.loads(dbutils.fs.head(self._dataset_manifest_path(), 16*1024*1024))
+    except Exception:
+        return None
+    
+    if manifest.get("data_source") != f"{self.course_config.data_source_name}/{self.course_config.data_source_version}":
+        return None
+    if manifest.get("manifest_version") != dataset_manifest_version:
+        return None  # Built by an earlier version of this notebook (e.g. with untyped CSV schemas), so it is rebuilt
+    return DatasetManifest(manifest["datasets"])
+
+# COMMAND ----------
+
+def __expose_dataset_manifest():
+    import functools
+
+    init = DBAcademyHelper.init
+    if getattr(init, "_dbacademy_manifest", False):
+        return  # Already wrapped by an earlier %run in this interpreter
+
+    @functools.wraps(init)
+    def wrapped_init(self, *args, **kwargs):
+        result = init(self, *args, **kwargs)
+
+        manifest = self.load_dataset_manifest()
+        if manifest is None and self.lesson_config.installing_datasets:
+            manifest = LazyDatasetManifest(self.build_dataset_manifest)
+        self.paths.manifest = manifest
+        
+        return result
+
+    wrapped_init._dbacademy_manifest = True
+    DBAcademyHelper.monkey_patch(wrapped_init)
+
+__expose_dataset_manifest()
@@ -0,0 +1,111 @@
+# Databricks notebook source
+# De-duplication on a normalized key. Instead of shuffling every normalized key column, each row is reduced to a 128-bit
+# fingerprint (two independently seeded 64-bit xxhash values) and duplicates are dropped on the first half of it. The second
+# half verifies each bucket: if it varies within a bucket, distinct keys collided on the first hash, and only the rows of
+# those buckets are de-duplicated again on their actual normalized values.
+
+# SQL templates for how each key column is normalized before hashing; a list of plain column names uses "exact"
+dedup_normalizers = {
+    "exact": "CAST({column} AS STRING)",
+    "lower": "lower(trim(CAST({column} AS STRING)))",
+    "digits": "regexp_replace(CAST({column} AS STRING), '[^0-9]', '')",
+}
+
+dedup_hash_columns = ["_dedup_h1", "_dedup_h2"]
+
+# COMMAND ----------
+
+def __normalized_keys(keys):
+    from pyspark.sql import functions as F
+
+    keys = keys if isinstance(keys, dict) else {k: "exact" for k in keys}
+    # xxhash64 skips nulls, so they are replaced by a marker that no normalized value can produce
+    return [F.coalesce(F.expr(dedup_normalizers[n].format(column=f"`{c}`")), F.lit("\u0000")) for c, n in keys.items()]
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def with_dedup_hash(self, df, keys):
+    from pyspark.sql import functions as F
+
+    normalized = __normalized_keys(keys)
+    return (df.withColumn(dedup_hash_columns[0], F.xxhash64(*normalized))
+              .withColumn(dedup_hash_columns[1], F.xxhash64(F.lit("dedup"), *normalized)))
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def dedup(self, df, keys, keep_hash=False):
+    from pyspark.sql import functions as F
+
+    h1, h2 = dedup_hash_columns
+    hashed = self.with_dedup_hash(df, keys)
+
+    # Only three longs per bucket are shuffled to find the buckets in which different keys share the first hash
+    collided = (hashed.groupBy(h1)
+                      .agg(F.min(h2).alias("min_h2"), F.max(h2).alias("max_h2"))
+                      .where("min_h2 != max_h2")
+                      .select(h1))
+
+    unique = hashed.join(F.broadcast(collided), h1, "left_anti").dropDuplicates([h1])
+
+    normalized_names = [f"_dedup_key_{i}" for i in range(len(keys))]
+    verified = (hashed.join(F.broadcast(collided), h1, "left_semi")
+                      .select("*", *[k.alias(n) for k, n in zip(__normalized_keys(keys), normalized_names)])
+                      .dropDuplicates(normalized_names)
+                      .drop(*normalized_names))
+
+    deduped = unique.unionByName(verified)
+    return deduped if keep_hash else deduped.drop(*dedup_hash_columns)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def dedup_incremental(self, source_path, target_path, keys, schema=None, format="csv", options=None, checkpoint_path=None):
+    import hashlib
+    from delta.tables import DeltaTable
+
+    # The target keeps the hash columns of its rows, so a micro-batch only reads those two columns instead of rehashing the
+    # whole table; the keys must therefore be the same on every run against the same target
+    options = options or {}
+    checkpoint_path = checkpoint_path or f"{self.paths.checkpoints}/dedup_{hashlib.md5(target_path.encode()).hexdigest()}"
+    target_exists = DeltaTable.isDeltaTable(spark, target_path)
+
+    if target_exists:
+        target_df = spark.read.format("delta").load(target_path)
+        if not set(dedup_hash_columns) <= set(target_df.columns):
+            # A target written before the hashes were kept is hashed once, here, rather than on every micro-batch
+            (self.with_dedup_hash(target_df, keys).write.format("delta").mode("overwrite")
+                 .option("overwriteSchema", "true").save(target_path))
+            target_df = spark.read.format("delta").load(target_path)
+        # The source is read with the types already in the target rather than as untyped CSV strings
+        schema = schema or target_df.drop(*dedup_hash_columns).schema
+
+    schema = schema or spark.read.format(format).options(**options).load(source_path).schema
+    records_before = self.count_records(target_path) if target_exists else 0
+
+    def append_new_records(batch_df, batch_id):
+        new_df = self.dedup(batch_df, keys, keep_hash=True)
+
+        # Anti-joining against the table also makes a replayed micro-batch a no-op
+        if DeltaTable.isDeltaTable(spark, target_path):
+            existing = spark.read.format("delta").load(target_path).select(*dedup_hash_columns)
+            new_df = new_df.join(existing, dedup_hash_columns, "left_anti")
+
+        new_df.write.format("delta").mode("append").save(target_path)
+
+    # The file source's checkpoint remembers which files were processed, so each run only reads newly arrived files
+    query = (spark.readStream
+                  .format(format)
+                  .options(**options)
+                  .schema(schema)
+                  .load(source_path)
+                  .writeStream
+                  .foreachBatch(append_new_records)
+                  .option("checkpointLocation", checkpoint_path)
+                  .trigger(availableNow=True)
+                  .start())
+    query.awaitTermination()
+
+    records_after = self.count_records(target_path) if DeltaTable.isDeltaTable(spark, target_path) else 0
+    return {"target_path": target_path, "records_added": records_after - records_before, "total_records": records_after}
@@ -0,0 +1,228 @@
+# Databricks notebook source
+# Snapshot-based lesson reset. With the Spark configuration "dbacademy.reset.mode" set to "snapshot", conclude_setup() records
+# the Delta version of every table in the lesson's schema and every Delta table under the working directory. The next
+# reset_lesson() then stops any active streams, removes everything else under the working directory (checkpoints included),
+# RESTOREs only the tables that have moved since, re-clones those that can no longer be restored and drops tables that did
+# not exist at snapshot time, instead of dropping and rebuilding everything. A snapshot is only used by the lesson that took
+# it, and only if setup created nothing but Delta tables; views and non-Delta tables cannot be restored. Without a usable
+# snapshot, or in the default "full" mode, reset_lesson() behaves exactly as before.
+
+@DBAcademyHelper.monkey_patch
+def _snapshot_path(self):
+    return f"{self.paths.working_dir.rstrip('/')}.{self.schema_name}.snapshot.json"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _snapshot_lesson_id(self):
+    # Lessons of a course can share a schema, so the snapshot is tied to the notebook that ran the setup
+    try:
+        notebook = dbutils.notebook.entry_point.getDbutils().notebook().getContext().notebookPath().get()
+    except Exception:
+        notebook = None
+    return {"lesson": self.lesson_config.name, "notebook": notebook}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _snapshot_reset_enabled(self):
+    return spark.conf.get("dbacademy.reset.mode", "full").lower() == "snapshot"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _find_working_dir_tables(self, path=None, max_depth=3):
+    path = path or self.paths.working_dir
+    try:
+        children = dbutils.fs.ls(path)
+    except Exception:
+        return []  # The working directory does not exist (yet)
+
+    if any(f.name == "_delta_log/" for f in children):
+        return [path.rstrip("/")]
+    if max_depth == 0:
+        return []
+    return [t for f in children if f.isDir() for t in self._find_working_dir_tables(f.path, max_depth-1)]
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _describe_table_version(self, table_ref):
+    history = spark.sql(f"DESCRIBE HISTORY {table_ref}").select("version", "operation", "operationParameters").collect()
+    
+    # A shallow clone can always be rebuilt from its source if its own history was vacuumed
+    clones = [h for h in history if h.operation == "CLONE"]
+    clone_source = clones[-1].operationParameters.get("source") if clones else None
+    
+    return {"version": max(h.version for h in history), "clone_source": clone_source}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def snapshot_lesson(self):
+    import json
+
+    snapshot = {"schema_name": self.schema_name, "lesson_id": self._snapshot_lesson_id(), "tables": {}, "paths": {}, "unrestorable": []}
+
+    if spark.catalog.databaseExists(self.schema_name):
+        for table in spark.catalog.listTables(self.schema_name):
+            if table.isTemporary: continue
+            if table.tableType == "VIEW":
+                snapshot["unrestorable"].append(table.name)
+                continue
+            try: snapshot["tables"][table.name] = self._describe_table_version(f"{self.schema_name}.{table.name}")
+            except Exception: snapshot["unrestorable"].append(table.name)  # Not a Delta table, so only a full reset rebuilds it
+
+    for path in self._find_working_dir_tables():
+        snapshot["paths"][path] = self._describe_table_version(f"delta.`{path}`")
+
+    dbutils.fs.put(self._snapshot_path(), json.dumps(snapshot, indent=2), True)
+    return snapshot
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _restore_table(self, table_ref, recorded):
+    try:
+        current = self._describe_table_version(table_ref)["version"]
+    except Exception:
+        current = None  # The table was dropped since the snapshot was taken
+
+    if current == recorded["version"]:
+        return "unchanged"
+
+    if current is not None:
+        try:
+            spark.sql(f"RESTORE TABLE {table_ref} TO VERSION AS OF {recorded['version']}")
+            return "restored"
+        except Exception:
+            pass  # Most likely the snapshot version was vacuumed; fall through to a re-clone
+
+    if recorded.get("clone_source") is None:
+        raise AssertionError(f"Unable to restore {table_ref} to version {recorded['version']}")
+
+    spark.sql(f"CREATE OR REPLACE TABLE {table_ref} SHALLOW CLONE {recorded['clone_source']}")
+    return "recloned"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _clear_working_dir(self, keep, path=None):
+    # Removes everything under the working directory except the given Delta tables; paths compare as listed by dbutils.fs.ls
+    path = path or self.paths.working_dir
+    keep = {k.rstrip("/") for k in keep}
+    try:
+        children = dbutils.fs.ls(path)
+    except Exception:
+        return []  # The working directory does not exist (yet)
+
+    removed = []
+    for f in children:
+        child = f.path.rstrip("/")
+        if child in keep:
+            continue
+        if any(k.startswith(child + "/") for k in keep):
+            removed.extend(self._clear_working_dir(keep, f.path))
+        else:
+            dbutils.fs.rm(f.path, True)
+            removed.append(child)
+    return removed
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def restore_lesson_snapshot(self):
+    import json, time
+    
+    start = time.time()
+    try:
+        snapshot = json.loads(dbutils.fs.head(self._snapshot_path(), 16*1024*1024))
+    except Exception:
+        return None
+
+    if snapshot.get("schema_name") != self.schema_name or not spark.catalog.databaseExists(self.schema_name):
+        return None
+    if snapshot.get("lesson_id") != self._snapshot_lesson_id():
+        return None  # Taken by another lesson that shares the schema
+
+    if snapshot["unrestorable"]:
+        # Setup created views or non-Delta tables; restoring would drop them without rebuilding them
+        print(f"The lesson snapshot cannot restore {', '.join(snapshot['unrestorable'])}, performing a full reset")
+        return None
+
+    print(f"Restoring the lesson from its snapshot", end="...")
+    results = {}
+
+    # Streams would keep writing to the restored tables, and their checkpoints (like any other non-Delta output) must not
+    # outlive the reset, or a restarted stream would resume from where the previous run left off
+    for query in spark.streams.active:
+        query.stop()
+        results[f"stream {query.name or query.id}"] = "stopped"
+
+    for path in self._clear_working_dir(snapshot["paths"].keys()):
+        results[path] = "removed"
+
+    checkpoints = self.paths.checkpoints.rstrip("/")
+    if not checkpoints.startswith(self.paths.working_dir.rstrip("/") + "/") and dbutils.fs.rm(checkpoints, True):
+        results[checkpoints] = "removed"
+
+    for table in spark.catalog.listTables(self.schema_name):
+        if table.isTemporary: continue
+        if table.name not in snapshot["tables"]:
+            spark.sql(f"DROP {'VIEW' if table.tableType == 'VIEW' else 'TABLE'} IF EXISTS {self.schema_name}.{table.name}")
+            results[f"{self.schema_name}.{table.name}"] = "dropped"
+
+    for name, recorded in snapshot["tables"].items():
+        results[f"{self.schema_name}.{name}"] = self._restore_table(f"{self.schema_name}.{name}", recorded)
+
+    for path, recorded in snapshot["paths"].items():
+        results[path] = self._restore_table(f"delta.`{path}`", recorded)
+
+    print(f"({int(time.time()-start)} seconds)")
+    for status in ["stopped", "removed", "restored", "recloned", "dropped"]:
+        changed = [k for k, v in results.items() if v == status]
+        if changed: print(f"| {status}: {', '.join(changed)}")
+
+    self._restored_from_snapshot = snapshot
+    return results
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def is_restored_from_snapshot(self, table_name):
+    snapshot = getattr(self, "_restored_from_snapshot", None)
+    return snapshot is not None and table_name in snapshot["tables"]
+
+# COMMAND ----------
+
+def __enable_snapshot_reset():
+    import functools
+
+    reset_lesson = DBAcademyHelper.reset_lesson
+    conclude_setup = DBAcademyHelper.conclude_setup
+    if getattr(reset_lesson, "_dbacademy_snapshots", False):
+        return  # Already wrapped by an earlier %run in this interpreter
+
+    @functools.wraps(reset_lesson)
+    def wrapped_reset_lesson(self, *args, **kwargs):
+        self._restored_from_snapshot = None
+        if self._snapshot_reset_enabled():
+            try:
+                if self.restore_lesson_snapshot() is not None:
+                    return
+            except Exception as e:
+                print(f"\nWARNING: Unable to restore the lesson from its snapshot, performing a full reset ({e})")
+        return reset_lesson(self, *args, **kwargs)
+
+    @functools.wraps(conclude_setup)
+    def wrapped_conclude_setup(self, *args, **kwargs):
+        result = conclude_setup(self, *args, **kwargs)
+        if self._snapshot_reset_enabled():
+            self.snapshot_lesson()
+        return result
+
+    wrapped_reset_lesson._dbacademy_snapshots = True
+    DBAcademyHelper.monkey_patch(wrapped_reset_lesson)
+    DBAcademyHelper.monkey_patch(wrapped_conclude_setup)
+
+__enable_snapshot_reset()
@@ -0,0 +1,64 @@
+# Databricks notebook source
+# Batch reads of selected partitions of a Hive-style partitioned directory (e.g. hour=0 ... hour=23), without listing or
+# parsing the partitions that are not requested. The layout (partition values and their files) of a course dataset comes
+# from the dataset index; for any other path it is listed once and then cached for the session. Only the matching partition
+# directories are handed to the reader, with basePath set so that the partition columns are still part of the DataFrame. The
+# schema of a course dataset comes from the dataset manifest; for any other path it is inferred from the selected partitions.
+# Opt-in: not loaded by _common; use %run ../Includes/_partitioned_reader after the classroom setup.
+
+# COMMAND ----------
+
+def __partition_value(value):
+    return int(value) if value.lstrip("-").isdigit() else value
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def partition_layout(self, name_or_path, refresh=False):
+    import re
+
+    try:
+        name = DatasetManifest(dataset_index).resolve(name_or_path)
+        root, relative_files = f"{self.paths.datasets}/{name}", dataset_index[name]["files"]
+    except KeyError:
+        name, root = None, name_or_path.rstrip("/")
+        if not hasattr(spark, "_dbacademy_partition_layouts"): spark._dbacademy_partition_layouts = {}
+        if refresh or root not in spark._dbacademy_partition_layouts:
+            prefix = root[len("dbfs:"):] if root.startswith("dbfs:") else root
+            paths = [p[len("dbfs:"):] if p.startswith("dbfs:") else p for p in self._list_data_files(root)]
+            spark._dbacademy_partition_layouts[root] = [p[len(prefix)+1:] for p in paths if p.startswith(prefix + "/")]
+        relative_files = spark._dbacademy_partition_layouts[root]
+
+    partitions = {}
+    for relative in relative_files:
+        directories = relative.split("/")[:-1]
+        spec = tuple(d.split("=", 1) for d in directories if re.fullmatch(r"[^=]+=[^=]*", d))
+        if spec:
+            partitions.setdefault("/".join(f"{k}={v}" for k, v in spec), {"values": {k: __partition_value(v) for k, v in spec}, "files": []})["files"].append(relative)
+
+    columns = list(next(iter(partitions.values()))["values"].keys()) if partitions else []
+    return {"dataset": name, "root": root, "partition_columns": columns, "partitions": partitions}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def read_partitions(self, name_or_path, format="json", schema=None, options=None, **filters):
+    layout = self.partition_layout(name_or_path)
+    unknown = set(filters) - set(layout["partition_columns"])
+    assert not unknown, f"Not partition columns of {layout['root']}: {', '.join(sorted(unknown))} (partitioned by {', '.join(layout['partition_columns'])})"
+
+    # Each filter is a single value, or any collection of values (a list, set or range)
+    wanted = {k: {v} if isinstance(v, (str, int)) else set(v) for k, v in filters.items()}
+    selected = sorted(d for d, p in layout["partitions"].items() if all(p["values"][k] in values for k, values in wanted.items()))
+    assert selected, f"No partitions of {layout['root']} match {filters}"
+
+    options = options or {}
+    reader = spark.read.format(format).options(**options).option("basePath", layout["root"])
+    paths = [f"{layout['root']}/{d}" for d in selected]
+
+    manifest = getattr(self.paths, "manifest", None)
+    if schema is None and layout["dataset"] is not None and manifest is not None:
+        schema = manifest.schema(layout["dataset"])  # Recorded, partition columns included, when the manifest was built
+
+    # Anything else is inferred from the selected partitions only, never from the whole directory
+    return (reader.schema(schema) if schema is not None else reader).load(paths)
@@ -0,0 +1,112 @@
+# Databricks notebook source
+# A persistent registry of inferred schemas, so that CSV and JSON sources are only scanned for inference once. Entries are
+# keyed by path, format and reader options and record the schema as a DDL string together with the data version it was
+# inferred from: the table version for Delta, otherwise a fingerprint of the file listing (names, sizes and modification
+# times). When the data version changes, only a sample of the new or changed files is inferred to check for drift. Each entry
+# is its own file, so that students sharing the datasets directory never overwrite each other's entries.
+
+schema_registry_sample_files = 3
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _schema_entry_path(self, key):
+    import hashlib
+    registry_dir = spark.conf.get("dbacademy.schema.registry", f"{self.paths.datasets.rstrip('/')}.schema-registry")
+    return f"{registry_dir}/{hashlib.md5(key.encode()).hexdigest()}.json"
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _load_schema_entry(self, key):
+    import json
+    try:
+        entry = json.loads(dbutils.fs.head(self._schema_entry_path(key), 16*1024*1024))
+    except Exception:
+        return None  # Not registered yet
+    return entry if entry.get("key") == key else None
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _save_schema_entry(self, key, entry):
+    import json
+    dbutils.fs.put(self._schema_entry_path(key), json.dumps({**entry, "key": key}, indent=2, sort_keys=True), True)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _list_data_files(self, path):
+    files, pending = {}, [path]
+    while pending:
+        for f in dbutils.fs.ls(pending.pop()):
+            if f.name.startswith(("_", ".")): continue  # Commit markers, _SUCCESS files and the Delta log are not data
+            if f.isDir(): pending.append(f.path)
+            else: files[f.path] = [f.size, getattr(f, "modificationTime", None)]
+    return files
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _data_version(self, path, format):
+    import hashlib, json
+
+    if format == "delta":
+        log = self.read_delta_log(path)
+        assert log is not None, f"{path} is not a Delta table"
+        return str(log["version"]), {}
+
+    files = self._list_data_files(path)
+    return hashlib.md5(json.dumps(files, sort_keys=True).encode()).hexdigest(), files
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _infer_schema_ddl(self, paths, format, options):
+    reader = spark.read.format(format).options(**options)
+    if format == "csv": reader = reader.option("inferSchema", "true")
+    return reader.load(paths)._jdf.schema().toDDL()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def get_schema(self, path, format="csv", on_drift="reinfer", **options):
+    import json, time
+
+    options = {k: str(v) for k, v in options.items() if k != "inferSchema"}
+    key = json.dumps([path, format, options], sort_keys=True)
+    entry = self._load_schema_entry(key)
+
+    data_version, files = self._data_version(path, format)
+    if entry is not None and entry["data_version"] == data_version:
+        return entry["schema_ddl"]
+
+    if entry is not None and format != "delta":
+        # The data changed: infer a sample of the files that are new or were rewritten (a different size or modification
+        # time) and compare it with the registered schema
+        known = entry.get("files", {})
+        changed = sorted(f for f, info in files.items() if known.get(f) != info)[:schema_registry_sample_files]
+        sample_ddl = self._infer_schema_ddl(changed, format, options) if changed else entry["schema_ddl"]
+
+        # A false positive (e.g. a sample that happens to infer a narrower type) only costs the full inference below
+        if sample_ddl == entry["schema_ddl"]:
+            entry.update({"data_version": data_version, "files": files, "verified_at": time.time()})
+            self._save_schema_entry(key, entry)
+            return entry["schema_ddl"]
+
+        message = f"Schema drift detected in {path}:\n| registered: {entry['schema_ddl']}\n| new files:  {sample_ddl}"
+        if on_drift == "error": raise AssertionError(message)
+        print(f"WARNING: {message}\n| Re-inferring the schema from all files.")
+
+    schema_ddl = self._infer_schema_ddl(path, format, options)
+    entry = {"schema_ddl": schema_ddl, "data_version": data_version, "files": files, "inferred_at": time.time(), "verified_at": time.time()}
+    self._save_schema_entry(key, entry)
+    return schema_ddl
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def read_with_schema(self, path, format="csv", on_drift="reinfer", **options):
+    options = {k: v for k, v in options.items() if k != "inferSchema"}
+    schema_ddl = self.get_schema(path, format, on_drift, **options)
+    return spark.read.format(format).options(**options).schema(schema_ddl).load(path)
@@ -0,0 +1,130 @@
+# Databricks notebook source
+# Records, for every call of the DBAcademyHelper lifecycle phases, how long it took, which Spark jobs it triggered and how
+# many dbutils.fs calls it made. Phases may nest (e.g. init() calling install_datasets()), in which case the jobs and calls
+# are attributed to the innermost phase and the parent is recorded on each entry.
+
+profiled_setup_phases = ["reset_learning_environment", "reset_lesson", "init", "install_datasets", "conclude_setup", "cleanup"]
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _setup_profile_state(self):
+    if not hasattr(self, "_setup_profile"):
+        self._setup_profile = {"phases": [], "stack": []}
+    return self._setup_profile
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _run_profiled_phase(self, phase, function, *args, **kwargs):
+    import time
+
+    state = self._setup_profile_state()
+    sc = spark.sparkContext
+    parent = state["stack"][-1] if state["stack"] else None
+
+    entry = {"phase": phase, 
+             "call": 1 + len([p for p in state["phases"] if p["phase"] == phase]),
+             "parent": parent["phase"] if parent else None,
+             "job_group": f"dbacademy-setup-{phase}-{len(state['phases'])}",
+             "fs_calls": {}}
+    state["phases"].append(entry)
+    state["stack"].append(entry)
+
+    previous_group = sc.getLocalProperty("spark.jobGroup.id")
+    previous_description = sc.getLocalProperty("spark.job.description")
+    sc.setJobGroup(entry["job_group"], f"DBAcademy setup: {phase}")
+
+    start = time.perf_counter()
+    try:
+        return function(self, *args, **kwargs)
+    finally:
+        entry["seconds"] = round(time.perf_counter()-start, 3)
+        entry["spark_jobs"] = sorted(sc.statusTracker().getJobIdsForGroup(entry["job_group"]))
+        state["stack"].pop()
+
+        # Hand the job group back to the enclosing phase, or to whatever the notebook had set before
+        sc.setLocalProperty("spark.jobGroup.id", parent["job_group"] if parent else previous_group)
+        sc.setLocalProperty("spark.job.description", f"DBAcademy setup: {parent['phase']}" if parent else previous_description)
+
+# COMMAND ----------
+
+def __count_fs_calls():
+    import functools
+
+    if getattr(dbutils.fs, "_dbacademy_profiled", False):
+        return  # Already instrumented by an earlier %run in this interpreter
+
+    def instrument(name):
+        original = getattr(dbutils.fs, name)
+
+        @functools.wraps(original)
+        def counted(*args, **kwargs):
+            state = getattr(DA, "_setup_profile", None) if "DA" in globals() else None
+            if state and state["stack"]:
+                calls = state["stack"][-1]["fs_calls"]
+                calls[name] = calls.get(name, 0) + 1
+            return original(*args, **kwargs)
+        
+        setattr(dbutils.fs, name, counted)
+
+    try:
+        for name in ["ls", "cp", "mv", "rm", "mkdirs", "put", "head", "mount", "mounts", "unmount"]:
+            instrument(name)
+        dbutils.fs._dbacademy_profiled = True
+    except Exception as e:
+        print(f"WARNING: Unable to instrument dbutils.fs, filesystem calls will not be profiled ({e})")
+
+def __profile_setup_phases():
+    import functools
+
+    for phase in profiled_setup_phases:
+        original = getattr(DBAcademyHelper, phase, None)
+        if original is None or getattr(original, "_dbacademy_profiled", False):
+            continue
+
+        def bind(phase, original):
+            @functools.wraps(original)
+            def profiled(self, *args, **kwargs):
+                return self._run_profiled_phase(phase, original, *args, **kwargs)
+            profiled._dbacademy_profiled = True
+            return profiled
+
+        DBAcademyHelper.monkey_patch(bind(phase, original))
+
+__count_fs_calls()
+__profile_setup_phases()
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def get_setup_profile(self):
+    phases = []
+    for entry in self._setup_profile_state()["phases"]:
+        entry = dict(entry)
+        entry["fs_calls_total"] = sum(entry["fs_calls"].values())
+        entry["spark_job_count"] = len(entry.get("spark_jobs", []))
+        phases.append(entry)
+
+    return {"course_code": self.course_config.course_code,
+            "lesson": self.lesson_config.name,
+            "total_seconds": round(sum(p.get("seconds", 0) for p in phases if p["parent"] is None), 3),
+            "phases": phases}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def export_setup_profile(self, path=None):
+    import json
+    profile_json = json.dumps(self.get_setup_profile(), indent=2)
+    if path is not None:
+        dbutils.fs.put(path, profile_json, True)
+    return profile_json
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def display_setup_profile(self):
+    profile = self.get_setup_profile()
+    rows = [(p["phase"], p["call"], p["parent"], p.get("seconds"), p["spark_job_count"], p["fs_calls_total"]) for p in profile["phases"]]
+    display(spark.createDataFrame(rows, "phase STRING, call INT, parent STRING, seconds DOUBLE, spark_jobs INT, fs_calls INT"))
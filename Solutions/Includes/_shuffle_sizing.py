@@ -0,0 +1,98 @@
+# Databricks notebook source
+# Sizes spark.sql.shuffle.partitions from the data a query will actually read instead of a fixed number. Input sizes come
+# from the relations' own statistics (file listings, or the Delta snapshot) so nothing is scanned. Batch queries are sized
+# for their whole input; streaming queries for one micro-batch, since the shuffle partitions of a stateful query are fixed
+# by its checkpoint and have to suit every batch that follows.
+
+# Shuffle blocks are binary and compressed; text formats shrink considerably on the way, columnar formats much less so
+shuffle_size_ratios = {"json": 0.35, "csv": 0.5, "text": 0.5, "parquet": 1.0, "orc": 1.0, "delta": 1.0}
+
+shuffle_policies = {
+    "batch": {"target_bytes": 128 * 1024 * 1024, "max_partitions": 10000},
+    "streaming": {"target_bytes": 32 * 1024 * 1024, "max_partitions": 2000},
+}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _leaf_format(self, leaf):
+    # Taken from the relation itself rather than its description, which also lists the column names
+    try:
+        if leaf.nodeName() == "LogicalRelation":
+            source = leaf.relation().fileFormat().getClass().getSimpleName()  # e.g. JsonFileFormat, DeltaParquetFileFormat
+        elif leaf.nodeName() == "StreamingRelation":
+            source = leaf.dataSource().className().split(".")[-1]  # e.g. json, delta or a fully qualified class name
+        else:
+            return None
+    except Exception:
+        return None  # Not a file-based relation (e.g. JDBC)
+
+    source = source.lower()
+    return next((f for f in shuffle_size_ratios if source == f or source.startswith(f)), None)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def estimate_shuffle_input(self, df):
+    plan = df._jdf.queryExecution().analyzed() if df.isStreaming else df._jdf.queryExecution().optimizedPlan()
+    leaves = plan.collectLeaves()
+    default_size = int(spark.conf.get("spark.sql.defaultSizeInBytes", str(2**63-1)))
+    inputs = []
+
+    for i in range(leaves.size()):
+        leaf = leaves.apply(i)
+        fmt = self._leaf_format(leaf)
+
+        if leaf.nodeName() == "StreamingRelation":
+            # One micro-batch worth of files: maxFilesPerTrigger times the source's average file size. Only Delta limits a
+            # batch to 1000 files by default; other file sources take every available file unless a limit is set.
+            options = leaf.dataSource().options()
+            max_files = options.get("maxFilesPerTrigger")
+            max_files = int(max_files.get()) if max_files.isDefined() else (1000 if fmt == "delta" else None)
+
+            batch_df = spark.read.format(leaf.dataSource().className()).load(options.get("path").get())
+            total_bytes = int(batch_df._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toString())
+            num_files = max(1, len(batch_df.inputFiles()))
+            size = total_bytes * min(max_files or num_files, num_files) // num_files
+        else:
+            size = int(leaf.stats().sizeInBytes().toString())
+            if size >= default_size:
+                continue  # No statistics (e.g. JDBC), so this input cannot inform the estimate
+
+        inputs.append({"relation": leaf.nodeName(), "format": fmt, "input_bytes": size,
+                       "shuffle_bytes": int(size * shuffle_size_ratios.get(fmt, 1.0))})
+    return inputs
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def recommend_shuffle_partitions(self, df, target_bytes=None, policy=None):
+    import math
+
+    policy = policy or ("streaming" if df.isStreaming else "batch")
+    settings = shuffle_policies[policy]
+    target_bytes = int(target_bytes or spark.conf.get(f"dbacademy.shuffle.{policy}.targetBytes", str(settings["target_bytes"])))
+    cores = spark.sparkContext.defaultParallelism
+
+    inputs = self.estimate_shuffle_input(df)
+    shuffle_bytes = sum(i["shuffle_bytes"] for i in inputs)
+
+    # Never fewer partitions than cores, and round up to full waves so that no core idles in the last one
+    partitions = max(1, math.ceil(shuffle_bytes / target_bytes))
+    partitions = min(settings["max_partitions"], max(cores, math.ceil(partitions / cores) * cores))
+
+    return {"policy": policy, "partitions": partitions, "estimated_shuffle_bytes": shuffle_bytes, "target_bytes": target_bytes, 
+            "cores": cores, "inputs": inputs}
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def configure_shuffle_partitions(self, df, target_bytes=None, policy=None):
+    recommendation = self.recommend_shuffle_partitions(df, target_bytes, policy)
+    spark.conf.set("spark.sql.shuffle.partitions", recommendation["partitions"])
+    
+    print(f"Set spark.sql.shuffle.partitions to {recommendation['partitions']} ({recommendation['policy']} policy, ~{recommendation['estimated_shuffle_bytes']:,} shuffle bytes)")
+    if recommendation["policy"] == "streaming":
+        print("| Note: a stateful query keeps the partition count recorded in its checkpoint, so set this before its first run")
+    
+    return recommendation
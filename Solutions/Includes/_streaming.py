@@ -0,0 +1,134 @@
+# Databricks notebook source
+# Event-driven replacement for block_until_stream_is_ready(). A single StreamingQueryListener per SparkSession records, per
+# run of a query, how many micro-batches have processed rows and wakes any waiter as soon as its queries are ready, instead of
+# sleeping between polls of query.recentProgress. The Python listener API was added in Spark 3.4; on older runtimes we fall
+# back to polling on a short interval.
+
+try:
+    from pyspark.sql.streaming import StreamingQueryListener
+except ImportError:
+    StreamingQueryListener = None
+
+# COMMAND ----------
+
+class StreamProgressTracker:
+
+    def __init__(self):
+        import threading
+        self.condition = threading.Condition()
+        # Keyed by run id: a restarted query keeps its id and name, but each run starts counting from zero
+        self.batches = {}       # run id -> number of progress events with processed rows
+        self.terminated = {}    # run id -> exception message, or None
+        self.callbacks = []
+
+    def record_start(self, run_id):
+        with self.condition:
+            self.batches[run_id] = 0
+            self.terminated.pop(run_id, None)
+
+    def record_progress(self, run_id, name, num_input_rows, progress=None):
+        with self.condition:
+            if num_input_rows > 0:
+                self.batches[run_id] = self.batches.get(run_id, 0) + 1
+            self.condition.notify_all()
+        for callback in list(self.callbacks):
+            callback(name or run_id, progress)
+
+    def record_termination(self, run_id, exception):
+        with self.condition:
+            self.terminated[run_id] = exception
+            self.condition.notify_all()
+
+if StreamingQueryListener is not None:
+    class StreamReadinessListener(StreamingQueryListener):
+
+        def __init__(self, tracker):
+            self.tracker = tracker
+
+        def onQueryStarted(self, event):
+            self.tracker.record_start(str(event.runId))
+
+        def onQueryProgress(self, event):
+            progress = event.progress
+            self.tracker.record_progress(str(progress.runId), progress.name, progress.numInputRows, progress)
+
+        def onQueryIdle(self, event):
+            pass
+
+        def onQueryTerminated(self, event):
+            self.tracker.record_termination(str(event.runId), event.exception)
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def _stream_progress_tracker(self):
+    # One listener per SparkSession, shared by every DA instance created in this interpreter
+    tracker = getattr(spark, "_dbacademy_stream_tracker", None)
+    if tracker is None:
+        tracker = StreamProgressTracker()
+        if StreamingQueryListener is not None:
+            spark.streams.addListener(StreamReadinessListener(tracker))
+        spark._dbacademy_stream_tracker = tracker
+    return tracker
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def block_until_streams_are_ready(self, queries, min_batches=1, timeout_seconds=300, progress_callback=None):
+    import time
+
+    tracker = self._stream_progress_tracker()
+    active = {**{q.name: q for q in spark.streams.active if q.name}, **{str(q.id): q for q in spark.streams.active}}
+    keys = [q if isinstance(q, str) else str(q.id) for q in queries]
+
+    missing = [k for k in keys if k not in active]
+    assert not missing, f"No active streaming queries were found for {missing}"
+    run_ids = {k: str(active[k].runId) for k in keys}
+
+    def current_run_batches(key):
+        return sum(1 for p in active[key].recentProgress if p.get("runId") == run_ids[key] and p.get("numInputRows", 0) > 0)
+
+    # Progress made before the listener was registered is only visible through recentProgress
+    for key in keys:
+        with tracker.condition:
+            tracker.batches[run_ids[key]] = max(tracker.batches.get(run_ids[key], 0), current_run_batches(key))
+
+    if progress_callback is not None:
+        tracker.callbacks.append(progress_callback)
+
+    print(f"Waiting for {', '.join(keys)} to process {min_batches} micro-batch(es)", end="...")
+    start = time.time()
+    try:
+        with tracker.condition:
+            while True:
+                if StreamingQueryListener is None:
+                    for k in keys: tracker.batches[run_ids[k]] = current_run_batches(k)
+
+                # A query that reached min_batches and then stopped (e.g. an availableNow trigger) is ready, not failed
+                pending = [k for k in keys if tracker.batches.get(run_ids[k], 0) < min_batches]
+                if not pending: break
+
+                # Listener events are delivered asynchronously and can trail the termination, so a stopped query's own
+                # progress has the final say on how many batches it completed
+                stopped = [k for k in pending if run_ids[k] in tracker.terminated or not active[k].isActive]
+                for k in stopped:
+                    tracker.batches[run_ids[k]] = max(tracker.batches.get(run_ids[k], 0), current_run_batches(k))
+                failed = [k for k in stopped if tracker.batches[run_ids[k]] < min_batches]
+                assert not failed, f"The streaming queries {failed} terminated before becoming ready"
+                if stopped: continue  # They all completed enough batches after all
+
+                remaining = timeout_seconds - (time.time() - start)
+                assert remaining > 0, f"The streaming queries {pending} were not ready after {timeout_seconds} seconds"
+
+                tracker.condition.wait(remaining if StreamingQueryListener is not None else min(remaining, 0.5))
+    finally:
+        if progress_callback is not None:
+            tracker.callbacks.remove(progress_callback)
+
+    print(f"({int(time.time()-start)} seconds)")
+
+# COMMAND ----------
+
+@DBAcademyHelper.monkey_patch
+def block_until_stream_is_ready(self, query, min_batches=1, timeout_seconds=300, progress_callback=None):
+    self.block_until_streams_are_ready([query], min_batches=min_batches, timeout_seconds=timeout_seconds, progress_callback=progress_callback)